@@ -0,0 +1,155 @@
+"""Auction-close scheduler benchmark.
+
+Seeds a throwaway SQLite database with ``--auctions`` listings that all end
+within the same ``--window`` seconds, a few bids each, and runs the closer
+on a thread while they expire. Reports how far behind end_time each auction
+was closed (lag p50/p99/max), closes per second and winner correctness.
+A share of the auctions (``--ties``) end on a tie: a plain bid and, after
+it, a standing maximum's answer at the same amount. The maximum leads, so
+its bid has to be the winning one. The run exits non-zero on any wrong
+winner.
+
+    python benchmarks/auction_close.py --auctions 20000 --window 60
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, select
+from models import db
+from models.user import User
+from models.category import Category
+from models.product import Product, Bid
+from services.bidding import refresh_bid_stats
+from services.scheduler import AuctionCloser
+from benchmarks.bid_storm import percentile
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(auctions, window, lead, bids_per_auction, ties, rng):
+    seller = User(username='seller', email='seller@bench.local', password_hash='x')
+    bidders = [User(username=f'bidder{i}', email=f'bidder{i}@bench.local', password_hash='x')
+               for i in range(20)]
+    category = Category(name='Bench')
+    db.session.add_all([seller, category] + bidders)
+    db.session.commit()
+
+    start = datetime.utcnow() + timedelta(seconds=lead)
+    db.session.execute(insert(Product), [
+        {'name': f'Lot {i}', 'starting_price': 1.0, 'current_price': 1.0, 'is_active': True,
+         'end_time': start + timedelta(seconds=rng.uniform(0, window)),
+         'seller_id': seller.id, 'category_id': category.id, 'created_at': datetime.utcnow()}
+        for i in range(auctions)
+    ])
+    product_ids = db.session.scalars(select(Product.id)).all()
+    bids = []
+    for product_id in product_ids:
+        steps = rng.randint(0, bids_per_auction)
+        for step in range(steps):
+            bids.append({'amount': 1.0 + step + rng.random(), 'product_id': product_id,
+                         'user_id': rng.choice(bidders).id, 'created_at': datetime.utcnow()})
+        if rng.random() < ties:
+            # Plain bid first, then the maximum holder's answer at the same amount
+            plain, maximum = rng.sample(bidders, 2)
+            bids.extend({'amount': 2.0 + steps, 'product_id': product_id, 'user_id': bidder.id,
+                         'created_at': datetime.utcnow()} for bidder in (plain, maximum))
+    if bids:
+        db.session.execute(insert(Bid), bids)
+    db.session.commit()
+    refresh_bid_stats()
+    return len(bids)
+
+
+def wrong_winners():
+    # The winning bid must carry the top amount and belong to the leader
+    best = select(Bid.product_id, func.max(Bid.amount).label('amount')) \
+        .group_by(Bid.product_id).subquery()
+    mismatched = db.session.scalar(
+        select(func.count(Product.id))
+        .outerjoin(Bid, Bid.id == Product.winning_bid_id)
+        .outerjoin(best, best.c.product_id == Product.id)
+        .where((func.coalesce(Bid.amount, -1) != func.coalesce(best.c.amount, -1))
+               | (func.coalesce(Bid.user_id, -1) != func.coalesce(Product.highest_bidder_id, -1)))
+    )
+    return mismatched
+
+
+def tied_auctions():
+    top = select(Bid.product_id, func.max(Bid.amount).label('amount')) \
+        .group_by(Bid.product_id).subquery()
+    tied = select(Bid.product_id) \
+        .join(top, (top.c.product_id == Bid.product_id) & (top.c.amount == Bid.amount)) \
+        .group_by(Bid.product_id).having(func.count(Bid.id) > 1).subquery()
+    return db.session.scalar(select(func.count()).select_from(tied))
+
+
+def run(auctions=20000, window=60.0, lead=2.0, bids_per_auction=4, ties=0.1, batch_size=500,
+        seed_value=1):
+    rng = random.Random(seed_value)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'close.db'))
+        with app.app_context():
+            db.create_all()
+            bid_rows = seed(auctions, window, lead, bids_per_auction, ties, rng)
+
+        closer = AuctionCloser(app, batch_size=batch_size)
+        started = time.perf_counter()
+        closer.start()
+        with app.app_context():
+            while db.session.scalar(select(func.count(Product.id)).where(Product.closed_at.is_(None))):
+                db.session.rollback()
+                time.sleep(0.2)
+            elapsed = time.perf_counter() - started
+            closer.stop()
+
+            lags = [(closed_at - end_time).total_seconds() for closed_at, end_time in
+                    db.session.execute(select(Product.closed_at, Product.end_time))]
+            report = {
+                'auctions': auctions,
+                'bids': bid_rows,
+                'tied_auctions': tied_auctions(),
+                'window_s': window,
+                'batch_size': batch_size,
+                'elapsed_s': round(elapsed, 2),
+                'closes_per_s_in_window': round(auctions / window, 1),
+                'lag_p50_ms': round(percentile(lags, 50) * 1000, 1),
+                'lag_p99_ms': round(percentile(lags, 99) * 1000, 1),
+                'lag_max_ms': round(max(lags) * 1000, 1),
+                'wrong_winners': wrong_winners(),
+            }
+            db.engine.dispose()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--auctions', type=int, default=20000)
+    parser.add_argument('--window', type=float, default=60.0, help='seconds over which they all end')
+    parser.add_argument('--bids', type=int, default=4, help='max bids per auction')
+    parser.add_argument('--ties', type=float, default=0.1, help='share of auctions ending on a tie')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    report = run(args.auctions, args.window, bids_per_auction=args.bids, ties=args.ties,
+                 batch_size=args.batch_size)
+    print(json.dumps(report))
+    if report['wrong_winners']:
+        raise SystemExit(f"{report['wrong_winners']} auctions closed with the wrong winning bid")
+
+
+if __name__ == '__main__':
+    main()
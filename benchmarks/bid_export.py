@@ -0,0 +1,98 @@
+"""Memory benchmark for the admin bid export.
+
+Generates throwaway databases of growing size with ``benchmarks/datagen.py``
+and downloads ``/admin/bids/export`` through the Flask test client, reading
+the streamed body chunk by chunk. Reports rows/sec, time to the first chunk
+and the Python heap peak (tracemalloc) per size. With streaming the peak
+stays flat as the bid count grows; ``--materialize`` also times the old
+approach of loading every ``Bid`` with ``.all()`` for comparison.
+
+    python benchmarks/bid_export.py --bids 50000 200000 --format csv jsonl
+    python benchmarks/bid_export.py --bids 100000 --materialize
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ADMIN = {'email': 'admin@auction.com', 'password': 'admin123'}
+
+
+def download(client, fmt):
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(f'/admin/bids/export?format={fmt}', buffered=False)
+    first_chunk, lines, size = None, 0, 0
+    for chunk in response.response:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - started
+        lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rows = lines - (fmt == 'csv')  # header line
+    return {'rows': rows, 'mb': round(size / 2 ** 20, 1), 'rows_per_s': round(rows / elapsed),
+            'first_chunk_ms': round(first_chunk * 1000, 1), 'peak_mb': round(peak / 2 ** 20, 2)}
+
+
+def materialize(app):
+    from models.product import Bid
+
+    with app.app_context():
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = len(Bid.query.all())
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'rows': rows, 'seconds': round(elapsed, 2), 'peak_mb': round(peak / 2 ** 20, 2)}
+
+
+def run(bids, formats, with_materialize, seed):
+    from app import create_app
+    from benchmarks.datagen import generate
+    from commands import init_database
+    from models import db
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'export.db'),
+                          'TESTING': True})
+        with app.app_context():
+            init_database()
+            with contextlib.redirect_stdout(sys.stderr):
+                generate(db, users=max(100, bids // 50), products=max(100, bids // 5), bids=bids, seed=seed)
+        client = app.test_client()
+        client.post('/login', data=ADMIN)
+        for fmt in formats:
+            results.append({'bids': bids, 'format': fmt, **download(client, fmt)})
+        if with_materialize:
+            results.append({'bids': bids, 'format': 'orm .all()', **materialize(app)})
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bids', type=int, nargs='+', default=[20000, 100000])
+    parser.add_argument('--format', nargs='+', choices=['csv', 'jsonl'], default=['csv', 'jsonl'])
+    parser.add_argument('--materialize', action='store_true', help='also load every Bid with .all()')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for bids in args.bids:
+        for result in run(bids, args.format, args.materialize, args.seed):
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Bid-flood benchmark for the bid rate limiter.
+
+Bot threads post bids on one product as fast as they can for ``--seconds``
+through the Flask test client, while one regular bidder places a bid
+every ``--interval`` seconds on the same product. Runs with the limiter
+off and with each backend. Reports requests served, bids committed, 429s,
+SQL statements per rejected request (0 means the rejection did no database
+work) and the regular bidder's latency.
+
+    python benchmarks/bid_flood.py --bots 8 --seconds 5
+    python benchmarks/bid_flood.py --backend off sqlite --rate 1 --burst 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+
+from benchmarks.bid_storm import percentile
+
+PASSWORD = 'password123'
+
+
+def seed(db, bots):
+    from models.category import Category
+    from models.product import Product
+    from models.user import User
+    from services.passwords import password_hasher
+
+    password_hash = password_hasher.hash(PASSWORD)
+    db.session.execute(insert(User.__table__), [
+        {'username': f'flood{i}', 'email': f'flood{i}@bench.local', 'is_admin': False,
+         'password_hash': password_hash} for i in range(bots + 2)])
+    seller = User.query.filter_by(email='flood0@bench.local').one()
+    product = Product(name='Closing soon', description='Bench listing', starting_price=10.0, current_price=10.0,
+                      end_time=datetime.utcnow() + timedelta(hours=1), seller_id=seller.id,
+                      category_id=Category.query.first().id)
+    db.session.add(product)
+    db.session.commit()
+    return product.id
+
+
+def run(backend, bots, seconds, interval, rate, burst):
+    from app import create_app
+    from commands import init_database
+    from models import db
+    from services.rate_limit import rate_limiter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'flood.db'),
+            'TESTING': True, 'PAGE_CACHE_TTL': 0,
+            'BID_RATE_PER_SECOND': 0 if backend == 'off' else rate, 'BID_RATE_BURST': burst,
+            'RATE_LIMIT_BACKEND': 'local' if backend == 'off' else backend,
+            'RATE_LIMIT_SPOOL': os.path.join(tmp, 'rate_limits.db'),
+        })
+        with app.app_context():
+            init_database()
+            product_id = seed(db, bots)
+            engine = db.engine
+
+        def login(index):
+            client = app.test_client()
+            client.post('/login', data={'email': f'flood{index}@bench.local', 'password': PASSWORD})
+            return client
+
+        bot_clients = [login(i + 2) for i in range(bots)]
+        regular = login(1)
+        url = f'/product/bid/{product_id}'
+        lock = threading.Lock()
+        statuses, rejected_statements, accepted = {}, [], [0]
+        regular_latencies = []
+        prices = iter(range(11, 10 ** 9))
+        local = threading.local()
+        statements = [0]
+
+        def count_statement(*args):
+            if getattr(local, 'counting', False):
+                local.count += 1
+
+        def bid(client):
+            with lock:
+                amount = next(prices)
+            local.counting, local.count = True, 0
+            response = client.post(url, data={'bid_amount': amount})
+            local.counting = False
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                statements[0] += local.count
+                accepted[0] += response.status_code == 200 and response.get_json()['success']
+                if response.status_code == 429:
+                    rejected_statements.append(local.count)
+            return response
+
+        deadline = time.monotonic() + seconds
+
+        def bot(client):
+            while time.monotonic() < deadline:
+                bid(client)
+
+        def regular_bidder():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                bid(regular)
+                regular_latencies.append(time.perf_counter() - started)
+                time.sleep(interval)
+
+        rejected_before = dict(rate_limiter.rejected)
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        threads = [threading.Thread(target=bot, args=(client,)) for client in bot_clients]
+        threads.append(threading.Thread(target=regular_bidder))
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        event.remove(engine, 'before_cursor_execute', count_statement)
+        with app.app_context():
+            db.engine.dispose()
+
+    requests = sum(statuses.values())
+    return {
+        'backend': backend,
+        'bots': bots,
+        'requests_per_s': round(requests / elapsed, 1),
+        'accepted_bids': accepted[0],
+        'limited_429': statuses.get(429, 0),
+        'statements_per_request': round(statements[0] / requests, 2),
+        'statements_per_429': round(sum(rejected_statements) / len(rejected_statements), 2)
+                              if rejected_statements else None,
+        'regular_p50_ms': round(percentile(regular_latencies, 50) * 1000, 1),
+        'regular_p99_ms': round(percentile(regular_latencies, 99) * 1000, 1),
+        'limiter_rejected': {scope: count - rejected_before.get(scope, 0)
+                             for scope, count in rate_limiter.rejected.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', nargs='+', choices=['off', 'local', 'sqlite'],
+                        default=['off', 'local', 'sqlite'])
+    parser.add_argument('--bots', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between the regular bidder\'s bids')
+    parser.add_argument('--rate', type=float, default=2, help='BID_RATE_PER_SECOND')
+    parser.add_argument('--burst', type=int, default=5, help='BID_RATE_BURST')
+    args = parser.parse_args()
+
+    for backend in args.backend:
+        print(json.dumps(run(backend, args.bots, args.seconds, args.interval, args.rate, args.burst)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""Threaded bid-storm benchmark for the bid engine.
+
+Many bidder threads hammer a handful of products on a throwaway SQLite
+database and we report accepted bids/sec plus p50/p99 latency per attempt.
+``--mode naive`` runs the old read-check-write path for comparison; the
+lost-update count shows how often it let a lower bid overwrite a higher one.
+``--mode group`` sends the same bids through the group-commit queue
+(BID_WRITE_MODE='group'), so ``commits`` can be compared with ``atomic``.
+``--readers`` adds threads that keep reading product pages during the storm,
+and ``--profile`` picks the database engine profile from config.Config
+(``all`` runs each one) to show how journal mode and pragmas affect both.
+
+    python benchmarks/bid_storm.py --threads 16 --bids 200 --products 4
+    python benchmarks/bid_storm.py --mode atomic --readers 8 --profile all
+    python benchmarks/bid_storm.py --mode atomic group --profile all
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from config.config import DATABASE_PROFILES
+from models import db
+from models.engine import init_db
+from models.user import User
+from models.category import Category
+from models.product import Product, Bid
+from services.bid_queue import bid_queue
+from services.bidding import place_bid_atomic, BUSY
+
+
+def make_app(db_path, profile='legacy'):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Unbounded overflow: every thread gets a connection, whatever the profile's pool
+    app.config['DATABASE_PROFILES'] = {profile: dict(DATABASE_PROFILES[profile], max_overflow=-1)}
+    app.config['DATABASE_PROFILE'] = profile
+    init_db(app, db)
+    return app
+
+
+def seed(app, threads, products):
+    with app.app_context():
+        db.create_all()
+        seller = User(username='seller', email='seller@bench.local', password_hash='x')
+        db.session.add(seller)
+        db.session.add_all([
+            User(username=f'bidder{i}', email=f'bidder{i}@bench.local', password_hash='x')
+            for i in range(threads)
+        ])
+        category = Category(name='Bench')
+        db.session.add(category)
+        db.session.flush()
+        end_time = datetime.utcnow() + timedelta(days=1)
+        for i in range(products):
+            db.session.add(Product(name=f'Lot {i}', starting_price=1.0, current_price=1.0,
+                                   end_time=end_time, seller_id=seller.id,
+                                   category_id=category.id))
+        db.session.commit()
+        user_ids = [u.id for u in User.query.filter(User.id != seller.id).all()]
+        product_ids = [p.id for p in Product.query.all()]
+    return user_ids, product_ids
+
+
+def naive_bid(product_id, user_id, amount):
+    # The pre-engine read-check-write path, kept only for comparison
+    try:
+        product = db.session.get(Product, product_id, populate_existing=True)
+        if amount <= product.current_price:
+            db.session.rollback()
+            return False
+        product.current_price = amount
+        db.session.add(Bid(amount=amount, user_id=user_id, product_id=product_id))
+        db.session.commit()
+        return True
+    except OperationalError:
+        db.session.rollback()
+        return False
+
+
+def bidder(app, mode, user_id, product_ids, attempts, latencies, accepted, busy, barrier):
+    rng = random.Random(user_id)
+    with app.app_context():
+        barrier.wait()
+        for _ in range(attempts):
+            product_id = rng.choice(product_ids)
+            seen = db.session.get(Product, product_id, populate_existing=True).current_price
+            db.session.rollback()
+            amount = round(seen + rng.uniform(1, 10), 2)
+
+            start = time.perf_counter()
+            if mode == 'naive':
+                ok = naive_bid(product_id, user_id, amount)
+            else:
+                place = bid_queue.place if mode == 'group' else place_bid_atomic
+                outcome = place(product_id, user_id, amount)
+                ok = outcome.accepted
+                if outcome.status == BUSY:
+                    busy.append(product_id)
+            latencies.append(time.perf_counter() - start)
+            if ok:
+                accepted.append(product_id)
+        db.session.remove()
+
+
+def reader(app, product_ids, latencies, errors, done):
+    """Render-path reads for a product page: the product and its top bids."""
+    rng = random.Random()
+    with app.app_context():
+        while not done.is_set():
+            product_id = rng.choice(product_ids)
+            start = time.perf_counter()
+            try:
+                db.session.get(Product, product_id, populate_existing=True)
+                Bid.query.filter_by(product_id=product_id).order_by(Bid.amount.desc()).limit(10).all()
+            except OperationalError:
+                errors.append(product_id)
+            db.session.rollback()
+            latencies.append(time.perf_counter() - start)
+        db.session.remove()
+
+
+def lost_updates(app):
+    """Count bids that were accepted below an earlier accepted bid."""
+    lost = 0
+    with app.app_context():
+        for product in Product.query.all():
+            best = 0.0
+            for bid in Bid.query.filter_by(product_id=product.id).order_by(Bid.id):
+                if bid.amount <= best:
+                    lost += 1
+                best = max(best, bid.amount)
+            if product.bids.count() and product.current_price != best:
+                lost += 1
+    return lost
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(mode='atomic', threads=16, bids=200, products=4, readers=0, profile='legacy'):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), profile)
+        user_ids, product_ids = seed(app, threads, products)
+        if mode == 'group':
+            app.config['BID_WRITE_MODE'] = 'group'
+            bid_queue.init_app(app)
+        commits = [0]
+
+        def count_commit(conn):
+            commits[0] += 1
+
+        latencies, accepted, busy = [], [], []
+        read_latencies, read_errors = [], []
+        done = threading.Event()
+        barrier = threading.Barrier(threads)
+        workers = [
+            threading.Thread(target=bidder, args=(app, mode, uid, product_ids, bids,
+                                                   latencies, accepted, busy, barrier))
+            for uid in user_ids
+        ]
+        reading = [threading.Thread(target=reader, args=(app, product_ids, read_latencies, read_errors, done))
+                   for _ in range(readers)]
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'commit', count_commit)
+        start = time.perf_counter()
+        for worker in reading + workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        event.remove(engine, 'commit', count_commit)
+        done.set()
+        for worker in reading:
+            worker.join()
+
+        report = {
+            'mode': mode,
+            'profile': profile,
+            'threads': threads,
+            'products': products,
+            'attempts': len(latencies),
+            'accepted': len(accepted),
+            'elapsed_s': round(elapsed, 3),
+            'accepted_per_s': round(len(accepted) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'busy': len(busy),
+            'commits': commits[0],
+            'lost_updates': lost_updates(app),
+        }
+        if readers:
+            report.update({
+                'readers': readers,
+                'reads_per_s': round(len(read_latencies) / elapsed, 1),
+                'read_p50_ms': round(percentile(read_latencies, 50) * 1000, 2),
+                'read_p99_ms': round(percentile(read_latencies, 99) * 1000, 2),
+                'read_errors': len(read_errors),
+            })
+        with app.app_context():
+            db.engine.dispose()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', nargs='+', choices=['atomic', 'naive', 'group', 'both'], default=['both'],
+                        help="'both' is atomic and naive")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--bids', type=int, default=200, help='bid attempts per thread')
+    parser.add_argument('--products', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=0, help='threads reading product pages meanwhile')
+    parser.add_argument('--profile', choices=list(DATABASE_PROFILES) + ['all'], default='legacy')
+    args = parser.parse_args()
+
+    modes = [mode for name in args.mode for mode in (['atomic', 'naive'] if name == 'both' else [name])]
+    profiles = list(DATABASE_PROFILES) if args.profile == 'all' else [args.profile]
+    for profile in profiles:
+        for mode in modes:
+            print(json.dumps(run(mode, args.threads, args.bids, args.products, args.readers, profile)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Bulk listing import benchmark.
+
+Writes ``--rows`` synthetic listings (a small share of them invalid) to a
+CSV or JSONL file and loads it into a throwaway SQLite database twice: once
+the way create_sample_data.py does, one ORM object and commit per row, and
+once through ``import_listings``. Reports rows per second for both and the
+per-row error count.
+
+    python benchmarks/bulk_import.py --rows 50000 --format jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import delete
+from models import db
+from models.user import User
+from models.category import Category
+from models.product import Product
+from models.migrations import upgrade
+from services.category_cache import category_cache
+from services.imports import import_listings, read_rows, validate
+
+CATEGORIES = ['Tools & Machinery', 'Plants & Gardening', 'DIY & Handmade', 'Events & Rentals']
+FIELDS = ['name', 'description', 'starting_price', 'category', 'end_time']
+
+
+def make_app(tmp):
+    app = Flask(__name__, instance_path=tmp)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(tmp, 'import.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    category_cache.init_app(app)
+    return app
+
+
+def write_listings(path, fmt, rows, invalid_ratio, rng):
+    end_time = (datetime.utcnow() + timedelta(days=7)).isoformat(timespec='minutes')
+    with open(path, 'w', newline='') as out:
+        writer = csv.DictWriter(out, FIELDS) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        for i in range(rows):
+            record = {'name': f'Bulk listing {i}', 'description': 'Imported in bulk',
+                      'starting_price': round(rng.uniform(10, 5000), 2),
+                      'category': rng.choice(CATEGORIES), 'end_time': end_time}
+            if rng.random() < invalid_ratio:
+                record['starting_price'] = 'n/a'
+            if writer:
+                writer.writerow(record)
+            else:
+                out.write(json.dumps(record) + '\n')
+
+
+def per_row(path, fmt, seller_id):
+    """The create_sample_data.py approach: one ORM add and commit per listing."""
+    categories = {category.name.lower(): category.id for category in category_cache.get()}
+    inserted = 0
+    with open(path, 'rb') as stream:
+        for _, record in read_rows(stream, fmt):
+            try:
+                values = validate(record, categories, datetime.utcnow())
+            except ValueError:
+                continue
+            db.session.add(Product(seller_id=seller_id, **values))
+            db.session.commit()
+            inserted += 1
+    return inserted
+
+
+def run(rows=50000, fmt='csv', chunk_size=500, per_row_limit=5000, invalid_ratio=0.01, seed_value=1):
+    rng = random.Random(seed_value)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'listings.{fmt}')
+        write_listings(path, fmt, rows, invalid_ratio, rng)
+        app = make_app(tmp)
+        with app.app_context():
+            upgrade()
+            seller = User(username='seller', email='seller@bench.local', password_hash='x')
+            db.session.add_all([seller] + [Category(name=name) for name in CATEGORIES])
+            db.session.commit()
+            category_cache.invalidate()
+
+            # The per-row path is slow, so it only loads the first rows of the file
+            sample = os.path.join(tmp, f'sample.{fmt}')
+            with open(path) as full, open(sample, 'w') as part:
+                for _ in range(min(rows, per_row_limit) + (fmt == 'csv')):
+                    part.write(full.readline())
+            started = time.perf_counter()
+            per_row_inserted = per_row(sample, fmt, seller.id)
+            per_row_s = time.perf_counter() - started
+            db.session.execute(delete(Product))
+            db.session.commit()
+
+            started = time.perf_counter()
+            with open(path, 'rb') as stream:
+                report = import_listings(stream, fmt, seller.id, chunk_size)
+            bulk_s = time.perf_counter() - started
+            db.engine.dispose()
+
+        return {
+            'rows': rows,
+            'format': fmt,
+            'chunk_size': chunk_size,
+            'per_row_rows': per_row_inserted,
+            'per_row_rows_per_s': round(per_row_inserted / per_row_s),
+            'bulk_inserted': report.inserted,
+            'bulk_failed': report.failed,
+            'bulk_s': round(bulk_s, 2),
+            'bulk_rows_per_s': round(report.inserted / bulk_s),
+            'speedup': round((report.inserted / bulk_s) / (per_row_inserted / per_row_s), 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--format', dest='fmt', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--per-row-limit', type=int, default=5000, help='rows loaded by the per-row baseline')
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.fmt, args.chunk_size, args.per_row_limit)))
+
+
+if __name__ == '__main__':
+    main()
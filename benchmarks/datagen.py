@@ -0,0 +1,221 @@
+"""Deterministic synthetic data generator.
+
+Fills the app database with production-shaped data using chunked Core
+inserts: users, products and bids, with the same ``--seed`` always giving
+the same rows. The data is skewed the way a live marketplace is:
+
+- a few categories and power sellers hold most of the listings
+- bids follow a heavy-tailed distribution, so a handful of hot auctions
+  collect most of them
+- bids bunch up towards each auction's end (sniping)
+- a share of auctions end in short bursts at the same evening minute
+- about a fifth of the auctions have already ended, with a winning bid
+
+Every generated user's password is ``password123``.
+
+    DATABASE_URL=sqlite:////tmp/big.db python benchmarks/datagen.py \\
+        --users 100000 --products 1000000 --bids 5000000 --seed 42
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select, text
+
+CHUNK_SIZE = 10000
+PASSWORD = 'password123'
+ENDED_SHARE = 0.2
+BURST_SHARE = 0.3
+BURST_MINUTE = (21, 0)  # auctions in a burst end at 21:00 UTC, within a minute
+
+ADJECTIVES = ['vintage', 'handmade', 'antique', 'organic', 'professional', 'wooden', 'brass', 'silk',
+              'industrial', 'portable', 'traditional', 'rare', 'heavy', 'compact', 'painted', 'leather',
+              'copper', 'khadi', 'bamboo', 'teak', 'embroidered', 'refurbished', 'electric', 'classic']
+NOUNS = ['drill', 'saree', 'poster', 'journal', 'lamp', 'camera', 'guitar', 'table', 'idol', 'pickle set',
+         'sewing machine', 'speaker', 'planter', 'bicycle', 'watch', 'rug', 'kettle', 'chair', 'tent',
+         'generator', 'tabla', 'sitar', 'painting', 'coin set', 'lathe', 'mixer', 'sofa', 'shawl']
+PLACES = ['Pune', 'Mumbai', 'Nashik', 'Jaipur', 'Surat', 'Indore', 'Kochi', 'Mysuru', 'Lucknow']
+CONDITIONS = ['Excellent condition.', 'Lightly used.', 'Brand new, sealed.', 'Needs minor repair.',
+              'Original box and bill.', 'Collector grade.']
+
+
+def zipf_weights(n, s=1.1):
+    return [1 / (rank + 1) ** s for rank in range(n)]
+
+
+def chunks(rows, size=CHUNK_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bid_counts(products, bids, rng):
+    """Split ``bids`` over ``products`` with Pareto weights: a few hot auctions, a long tail."""
+    weights = [rng.paretovariate(1.5) - 1 for _ in range(products)]
+    scale = bids / sum(weights)
+    counts = []
+    for weight in weights:
+        share = weight * scale
+        counts.append(int(share) + (rng.random() < share - int(share)))
+    return counts
+
+
+def end_time_for(created_at, now, rng):
+    if rng.random() < ENDED_SHARE:
+        return now - timedelta(hours=rng.uniform(1, 24 * 20))
+    if rng.random() < BURST_SHARE:
+        day = (now + timedelta(days=rng.randint(0, 6))).replace(hour=BURST_MINUTE[0], minute=BURST_MINUTE[1],
+                                                               second=0, microsecond=0)
+        if day <= now:
+            day += timedelta(days=1)
+        return day + timedelta(seconds=rng.uniform(0, 60))
+    return now + timedelta(hours=rng.uniform(1, 24 * 30))
+
+
+def generate(db, users=1000, products=10000, bids=50000, seed=42, chunk_size=CHUNK_SIZE, log=print):
+    """Insert the synthetic data set into ``db`` (inside an app context); returns row counts."""
+    from models.user import User
+    from models.category import Category
+    from models.product import Product, Bid
+    from services.category_cache import category_cache
+    from services.passwords import password_hasher
+    from services.stats import materialized_enabled, refresh_category_stats
+
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    started = time.perf_counter()
+    if db.engine.dialect.name == 'sqlite':
+        # Bulk load: skip the fsync on every chunk commit and keep the
+        # indexes being filled in memory
+        db.session.execute(text('PRAGMA synchronous=OFF'))
+        db.session.execute(text('PRAGMA cache_size=-262144'))
+
+    def next_id(model):
+        return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+    def write(model, rows, label):
+        written = 0
+        for batch in chunks(rows, chunk_size):
+            db.session.execute(insert(model.__table__), batch)
+            db.session.commit()
+            written += len(batch)
+        log(f'{label}: {written} rows ({time.perf_counter() - started:.1f}s)')
+        return written
+
+    categories = [category.id for category in Category.query.order_by(Category.id)]
+    if not categories:
+        raise SystemExit('No categories, run flask --app app init-db first')
+    category_weights = zipf_weights(len(categories), s=0.9)
+    rng.shuffle(categories)
+
+    first_user = next_id(User)
+    password_hash = password_hasher.hash(PASSWORD)
+    write(User, ({'id': first_user + i, 'username': f'user{seed}_{first_user + i}',
+                  'email': f'user{first_user + i}@seed{seed}.local', 'password_hash': password_hash,
+                  'is_admin': False, 'created_at': now - timedelta(days=rng.uniform(30, 720))}
+                 for i in range(users)), 'users')
+    user_ids = range(first_user, first_user + users)
+    seller_weights = zipf_weights(users, s=1.05)
+    sellers = rng.choices(user_ids, seller_weights, k=products)
+    product_categories = rng.choices(categories, category_weights, k=products)
+
+    first_product = next_id(Product)
+    first_bid = next_id(Bid)
+    counts = bid_counts(products, bids, rng)
+    bid_rows = []
+    bid_id = first_bid
+
+    def listings():
+        nonlocal bid_id
+        for i in range(products):
+            product_id = first_product + i
+            seller_id = sellers[i]
+            created_at = now - timedelta(hours=rng.uniform(1, 24 * 40))
+            end_time = end_time_for(created_at, now, rng)
+            created_at = min(created_at, end_time - timedelta(hours=1))
+            price = round(rng.lognormvariate(7, 1.3), 2)
+            product = {
+                'id': product_id,
+                'name': f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} from {rng.choice(PLACES)}',
+                'description': f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)}. {rng.choice(CONDITIONS)}',
+                'starting_price': price, 'current_price': price, 'bid_count': 0,
+                'end_time': end_time, 'is_active': end_time > now,
+                'seller_id': seller_id, 'category_id': product_categories[i],
+                'created_at': created_at, 'highest_bidder_id': None, 'last_bid_at': None,
+                'closed_at': None if end_time > now else end_time,
+            }
+
+            # Bid times bunch towards the end of the auction
+            last = min(end_time, now)
+            span = (last - created_at).total_seconds()
+            times = sorted(created_at + timedelta(seconds=span * rng.betavariate(3, 1))
+                           for _ in range(counts[i]))
+            amount, step = price, max(1.0, round(price * rng.uniform(0.005, 0.03), 2))
+            for created in times:
+                bidder = rng.choice(user_ids)
+                if bidder == seller_id:
+                    continue
+                amount = round(amount + step * rng.uniform(1, 3), 2)
+                bid_rows.append({'id': bid_id, 'amount': amount, 'user_id': bidder,
+                                 'product_id': product_id, 'created_at': created})
+                product.update(current_price=amount, highest_bidder_id=bidder, last_bid_at=created)
+                product['bid_count'] += 1
+                bid_id += 1
+            if product['closed_at'] is not None and product['bid_count']:
+                product['winning_bid_id'] = bid_id - 1
+            else:
+                product['winning_bid_id'] = None
+            yield product
+
+    # Products and their bids are written in step so memory stays bounded
+    written_products = written_bids = 0
+    for batch in chunks(listings(), chunk_size):
+        # Table-level inserts: one executemany per chunk, no ORM batching
+        db.session.execute(insert(Product.__table__), batch)
+        if bid_rows:
+            db.session.execute(insert(Bid.__table__), bid_rows)
+        db.session.commit()
+        written_products += len(batch)
+        written_bids += len(bid_rows)
+        bid_rows.clear()
+    log(f'products: {written_products} rows, bids: {written_bids} rows '
+        f'({time.perf_counter() - started:.1f}s)')
+
+    if materialized_enabled():
+        refresh_category_stats()
+    category_cache.invalidate()
+    return {'users': users, 'products': written_products, 'bids': written_bids,
+            'seconds': round(time.perf_counter() - started, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--bids', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from app import app, db
+    from commands import init_database
+    with app.app_context():
+        init_database()
+        print(f"Generating into {db.engine.url}")
+        counts = generate(db, args.users, args.products, args.bids, args.seed, args.chunk_size)
+    print(json.dumps(counts))
+
+
+if __name__ == '__main__':
+    main()
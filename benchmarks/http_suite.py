@@ -0,0 +1,357 @@
+"""HTTP benchmark suite for the main pages.
+
+Generates a throwaway database with ``benchmarks/datagen.py`` and drives
+home, products_by_category, view_product, place_bid and the admin pages,
+either in-process through the Flask test client or over HTTP against a
+local gunicorn. Prints throughput and latency percentiles per endpoint as
+JSON, tagged with the current commit. ``--output`` saves the results and
+``--compare`` prints the change against an earlier run. ``--profile``
+picks the database engine profile (``DATABASE_PROFILE``) for the run.
+With the test client the SQL statements per request are counted too;
+``--user-cache`` turns the logged-in user cache off, on, or on with
+session claims, to see what the user lookup costs. The bid rate limiter
+is off unless ``--rate-limit`` is given; its 429s are counted as
+``limited``, not as errors. ``--metrics off`` runs without the request,
+SQL and template instrumentation, to measure what it costs.
+
+    python benchmarks/http_suite.py --scale small --output before.json
+    python benchmarks/http_suite.py --scale small --client gunicorn --workers 4 \\
+        --compare before.json
+    python benchmarks/http_suite.py --profile legacy --output legacy.json
+    python benchmarks/http_suite.py --user-cache off --only place_bid admin.products
+"""
+import argparse
+import contextlib
+import http.client
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+SCALES = {
+    'small': {'users': 1000, 'products': 10000, 'bids': 50000},
+    'medium': {'users': 10000, 'products': 100000, 'bids': 500000},
+    'large': {'users': 100000, 'products': 1000000, 'bids': 5000000},
+}
+ADMIN = ('admin@auction.com', 'admin123')
+WARMUP = 5
+USER_CACHE_MODES = {
+    'off': {'USER_CACHE_TTL': '0'},
+    'on': {},
+    'claims': {'USER_SESSION_CLAIMS': '1'},
+}
+
+
+class TestClientSession:
+    """One signed-in (or anonymous) visitor using the Flask test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.get_data()
+
+
+class HTTPSession:
+    """One visitor over a keep-alive HTTP connection, with a cookie jar."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cookies = SimpleCookie()
+        self.connection = None
+
+    def request(self, method, path, data=None):
+        body = urlencode(data) if data is not None else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                payload = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # Sync workers close the connection after every response
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or ():
+            self.cookies.load(header)
+        if response.getheader('Connection', '').lower() == 'close':
+            self.connection.close()
+            self.connection = None
+        return response.status, payload
+
+
+def login(session, email, password):
+    status, _ = session.request('POST', '/login', {'email': email, 'password': password})
+    if status != 302:
+        raise SystemExit(f'Login failed for {email} (status {status})')
+    return session
+
+
+def pick_targets(db, rng):
+    from sqlalchemy import func, select
+    from models.user import User
+    from models.product import Product
+
+    now = datetime.utcnow()
+    active = (Product.is_active == True) & (Product.end_time > now)
+    hot_category = db.session.scalar(select(Product.category_id).group_by(Product.category_id)
+                                     .order_by(func.count().desc()).limit(1))
+    hot = db.session.execute(select(Product.id, Product.seller_id, Product.current_price).where(active)
+                             .order_by(Product.bid_count.desc()).limit(1)).one()
+    active_ids = db.session.scalars(select(Product.id).where(active).limit(5000)).all()
+    bidders = db.session.scalars(select(User.email).where(User.is_admin == False, User.id != hot.seller_id)
+                                 .order_by(User.id).limit(16)).all()
+    return {
+        'category_id': hot_category,
+        'hot_product': hot.id,
+        'hot_price': hot.current_price,
+        'product_ids': rng.sample(active_ids, min(len(active_ids), 500)),
+        'bidders': bidders,
+    }
+
+
+def endpoints(targets, rng):
+    """(name, method, path factory, form factory, who) for every benchmarked view."""
+    amounts = itertools.count()
+    lock = threading.Lock()
+
+    def next_bid():
+        with lock:
+            step = next(amounts)
+        return {'bid_amount': f"{targets['hot_price'] + 1 + step:.2f}"}
+
+    return [
+        ('home', 'GET', lambda: '/', None, 'anonymous'),
+        ('products_by_category', 'GET', lambda: f"/category/{targets['category_id']}", None, 'anonymous'),
+        ('view_product', 'GET', lambda: f"/product/{rng.choice(targets['product_ids'])}", None, 'anonymous'),
+        ('place_bid', 'POST', lambda: f"/product/bid/{targets['hot_product']}", next_bid, 'bidder'),
+        ('admin.dashboard', 'GET', lambda: '/admin/dashboard', None, 'admin'),
+        ('admin.products', 'GET', lambda: '/admin/products', None, 'admin'),
+        ('admin.categories', 'GET', lambda: '/admin/categories', None, 'admin'),
+        ('database_info', 'GET', lambda: '/admin/database-info', None, 'admin'),
+    ]
+
+
+def drive(sessions, method, path, form, requests):
+    """Spread ``requests`` over one thread per session.
+
+    Returns latencies, errors, accepted bids, rate-limited requests and wall time.
+    """
+    latencies, errors, accepted, limited = [], [0], [0], [0]
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker(session):
+        mine, failed, ok, throttled = [], 0, 0, 0
+        while next(counter) < requests:
+            started = time.perf_counter()
+            status, body = session.request(method, path(), form() if form else None)
+            mine.append(time.perf_counter() - started)
+            if status == 429:
+                throttled += 1
+            elif status >= 400:
+                failed += 1
+            elif method == 'POST' and b'"success":true' in body.replace(b' ', b''):
+                ok += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+            accepted[0] += ok
+            limited[0] += throttled
+
+    threads = [threading.Thread(target=worker, args=(session,)) for session in sessions]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], accepted[0], limited[0], time.perf_counter() - started
+
+
+def run_suite(make_session, targets, concurrency, requests, rng, only=None, engine=None):
+    """Drive every endpoint; with ``engine`` also count its SQL statements per request."""
+    # Imported late: bid_storm loads config, which must see DATABASE_PROFILE first
+    from benchmarks.bid_storm import percentile
+    from utils.query_counter import QueryCounter
+
+    results = {}
+    sessions = {
+        'anonymous': [make_session() for _ in range(concurrency)],
+        'admin': [login(make_session(), *ADMIN) for _ in range(concurrency)],
+        'bidder': [login(make_session(), email, 'password123')
+                   for email in itertools.islice(itertools.cycle(targets['bidders']), concurrency)],
+    }
+    for name, method, path, form, who in endpoints(targets, rng):
+        if only and name not in only:
+            continue
+        drive(sessions[who][:1], method, path, form, WARMUP)
+        with QueryCounter(engine) if engine is not None else contextlib.nullcontext() as counter:
+            latencies, errors, accepted, limited, wall = drive(sessions[who], method, path, form, requests)
+        result = {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / wall, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+        }
+        if method == 'POST':
+            result['accepted'] = accepted
+            result['limited'] = limited
+        if counter is not None:
+            result['queries_per_request'] = round(counter.count / len(latencies), 2)
+        results[name] = result
+    return results
+
+
+def start_gunicorn(env, port, workers, threads):
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--worker-class', 'gthread', '--threads', str(threads), '--log-level', 'warning', 'app:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/login')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+        if process.poll() is not None:
+            raise SystemExit('gunicorn exited during startup')
+    process.terminate()
+    raise SystemExit('gunicorn did not start within 60s')
+
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=ROOT, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(baseline, current):
+    print(f"{'endpoint':<22}{'rps':>18}{'p50 ms':>20}{'p99 ms':>20}{'queries':>20}", file=sys.stderr)
+    for name, now in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ('rps', 'p50_ms', 'p99_ms'):
+            change = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            cells.append(f'{before[key]:>7} > {now[key]:<7}{change:+5.0f}%')
+        if 'queries_per_request' in before and 'queries_per_request' in now:
+            cells.append(f"{before['queries_per_request']:>7} > {now['queries_per_request']:<7}")
+        print(f'{name:<22}' + ''.join(f'{cell:>20}' for cell in cells), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--client', choices=['test', 'gunicorn'], default='test')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent visitors per endpoint')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per endpoint')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='*', help='endpoint names to run')
+    parser.add_argument('--profile', help='DATABASE_PROFILE for the run (default: the Config default)')
+    parser.add_argument('--user-cache', choices=USER_CACHE_MODES,
+                        help='logged-in user cache for the run (default: the Config default)')
+    parser.add_argument('--rate-limit', action='store_true', help='keep the bid rate limiter on')
+    parser.add_argument('--metrics', choices=['off', 'on'], help='request instrumentation (default: the Config default)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'))
+        if args.profile:
+            env['DATABASE_PROFILE'] = args.profile
+        if not args.rate_limit:
+            env['BID_RATE_PER_SECOND'] = '0'
+        if args.user_cache:
+            env.update(USER_CACHE_MODES[args.user_cache])
+        if args.metrics:
+            env['METRICS_ENABLED'] = '1' if args.metrics == 'on' else '0'
+        os.environ.update(env)
+        with contextlib.redirect_stdout(sys.stderr):  # keep stdout for the JSON report
+            from app import app, db
+        from benchmarks.datagen import generate
+        from commands import init_database
+
+        rng = random.Random(args.seed)
+        with app.app_context():
+            init_database()
+            counts = generate(db, seed=args.seed, log=lambda line: print(line, file=sys.stderr),
+                              **SCALES[args.scale])
+            targets = pick_targets(db, rng)
+
+        process = None
+        if args.client == 'gunicorn':
+            process = start_gunicorn(env, args.port, args.workers, args.threads)
+            make_session = lambda: HTTPSession('127.0.0.1', args.port)
+            engine = None  # statements run in the gunicorn workers
+        else:
+            make_session = lambda: TestClientSession(app)
+            with app.app_context():
+                engine = db.engine
+        try:
+            results = run_suite(make_session, targets, args.concurrency, args.requests, rng, args.only, engine)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+        with app.app_context():
+            db.engine.dispose()
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'config': {'scale': args.scale, 'client': args.client, 'concurrency': args.concurrency,
+                   'requests': args.requests, 'seed': args.seed, 'profile': app.config['DATABASE_PROFILE'],
+                   'user_cache_ttl': app.config['USER_CACHE_TTL'],
+                   'bid_rate_per_second': app.config['BID_RATE_PER_SECOND'],
+                   'user_session_claims': app.config['USER_SESSION_CLAIMS'],
+                   'metrics': app.config['METRICS_ENABLED'],
+                   'workers': args.workers if args.client == 'gunicorn' else None,
+                   'users': counts['users'], 'products': counts['products'], 'bids': counts['bids']},
+        'endpoints': results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(json.load(baseline), report)
+
+
+if __name__ == '__main__':
+    main()
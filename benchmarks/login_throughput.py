@@ -0,0 +1,148 @@
+"""Login-storm benchmark for password hashing.
+
+Login threads post valid credentials as fast as they can while reader
+threads keep loading a page, all against a throwaway database through the
+Flask test client. Reports logins/sec, login latency, how many logins were
+shed with a 503 and the reader latency, i.e. how much the hashing starves
+everything else. ``--executor sync`` hashes on the request thread as before;
+``thread`` uses the capped pool from services.passwords. A share of the users
+start with a hash made by ``--legacy-method`` and are rehashed on login.
+
+    python benchmarks/login_throughput.py --executor sync thread --workers 1
+    python benchmarks/login_throughput.py --method scrypt:16384:8:1 --logins 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from benchmarks.bid_storm import percentile
+
+PASSWORD = 'password123'
+
+
+def seed(db, users, legacy_share, legacy_method):
+    from models.user import User
+    from services.passwords import password_hasher
+
+    current, legacy = password_hasher.hash(PASSWORD), generate_password_hash(PASSWORD, legacy_method)
+    legacy_count = int(users * legacy_share)
+    db.session.execute(insert(User.__table__), [
+        {'username': f'login{i}', 'email': f'login{i}@bench.local', 'is_admin': False,
+         'password_hash': legacy if i < legacy_count else current}
+        for i in range(users)])
+    db.session.commit()
+    return [f'login{i}@bench.local' for i in range(users)]
+
+
+def run(executor, workers, method, legacy_method, threads, logins, readers, users, legacy_share, queue):
+    from app import create_app
+    from commands import init_database
+    from models import db
+    from models.user import User
+    from services.passwords import method_prefix, password_hasher
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'login.db'),
+            'PASSWORD_HASH_METHOD': method, 'PASSWORD_HASH_EXECUTOR': executor,
+            'PASSWORD_HASH_WORKERS': workers, 'PASSWORD_HASH_QUEUE': queue,
+            'PAGE_CACHE_TTL': 0, 'TESTING': True,
+        })
+        with app.app_context():
+            init_database()
+            emails = seed(db, users, legacy_share, legacy_method)
+
+        counter = iter(range(logins))
+        lock = threading.Lock()
+        login_latencies, read_latencies = [], []
+        statuses = {}
+        done = threading.Event()
+
+        def login_worker(index):
+            client = app.test_client()
+            while True:
+                with lock:
+                    attempt = next(counter, None)
+                if attempt is None:
+                    return
+                email = emails[(index + attempt * threads) % len(emails)]
+                started = time.perf_counter()
+                status = client.post('/login', data={'email': email, 'password': PASSWORD}).status_code
+                login_latencies.append(time.perf_counter() - started)
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+
+        def reader():
+            client = app.test_client()
+            while not done.is_set():
+                started = time.perf_counter()
+                client.get('/')
+                read_latencies.append(time.perf_counter() - started)
+
+        login_threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(threads)]
+        reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+        started = time.perf_counter()
+        for thread in reader_threads + login_threads:
+            thread.start()
+        for thread in login_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        with app.app_context():
+            legacy_left = User.query.filter(~User.password_hash.startswith(method_prefix(method) + '$')).count()
+            db.engine.dispose()
+
+    return {
+        'executor': executor,
+        'workers': workers if executor == 'thread' else None,
+        'method': method_prefix(method),
+        'threads': threads,
+        'logins': len(login_latencies),
+        'ok': statuses.get(302, 0),
+        'shed_503': statuses.get(503, 0),
+        'logins_per_s': round(statuses.get(302, 0) / elapsed, 1),
+        'login_p50_ms': round(percentile(login_latencies, 50) * 1000, 1),
+        'login_p99_ms': round(percentile(login_latencies, 99) * 1000, 1),
+        'readers': readers,
+        'reads_per_s': round(len(read_latencies) / elapsed, 1),
+        'read_p50_ms': round(percentile(read_latencies, 50) * 1000, 1),
+        'read_p99_ms': round(percentile(read_latencies, 99) * 1000, 1),
+        'legacy_hashes': int(users * legacy_share),
+        'legacy_left': legacy_left,
+        'busy': password_hasher.busy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--executor', nargs='+', choices=['sync', 'thread'], default=['sync', 'thread'])
+    parser.add_argument('--workers', type=int, default=1, help='hashing threads for the thread executor')
+    parser.add_argument('--queue', type=int, default=16, help='PASSWORD_HASH_QUEUE')
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--legacy-method', default='pbkdf2:sha256:600000')
+    parser.add_argument('--legacy-share', type=float, default=0.25)
+    parser.add_argument('--threads', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--logins', type=int, default=160)
+    parser.add_argument('--readers', type=int, default=2, help='threads loading the home page meanwhile')
+    parser.add_argument('--users', type=int, default=64)
+    args = parser.parse_args()
+
+    for executor in args.executor:
+        print(json.dumps(run(executor, args.workers, args.method, args.legacy_method, args.threads,
+                             args.logins, args.readers, args.users, args.legacy_share, args.queue)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Write-load benchmark for proxy bidding.
+
+Runs the same contested auctions twice on throwaway databases through the
+Flask test client. In ``manual`` mode every bidder has a private limit
+and, whenever outbid, posts the next step to ``place_bid`` until the price
+passes that limit: one request, bid row and commit per step. In ``proxy``
+mode every bidder posts that limit once to the max-bid endpoint. Reports
+requests, write transactions (COMMITs), bid rows and wall time per
+auction, and checks both modes end with the same winners. It then checks
+the tie rule in both bid write modes: a plain bid equal to a standing
+maximum loses to that earlier maximum, which leads at that amount.
+
+    python benchmarks/proxy_war.py --auctions 20 --bidders 5
+    python benchmarks/proxy_war.py --step 10 --max-limit 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+
+PASSWORD = 'password123'
+STARTING_PRICE = 10.0
+
+
+def seed(db, auctions, bidders):
+    from models.category import Category
+    from models.product import Product
+    from models.user import User
+    from services.passwords import password_hasher
+
+    password_hash = password_hasher.hash(PASSWORD)
+    db.session.execute(insert(User.__table__), [
+        {'username': f'war{i}', 'email': f'war{i}@bench.local', 'is_admin': False, 'password_hash': password_hash}
+        for i in range(bidders + 1)])
+    seller_id, *bidder_ids = [user.id for user in User.query.filter(User.email.like('war%')).order_by(User.id)]
+    end_time = datetime.utcnow() + timedelta(days=1)
+    db.session.execute(insert(Product.__table__), [
+        {'name': f'Contested {i}', 'description': 'Bench listing', 'starting_price': STARTING_PRICE,
+         'current_price': STARTING_PRICE, 'end_time': end_time, 'seller_id': seller_id,
+         'category_id': Category.query.first().id, 'is_active': True, 'bid_count': 0}
+        for i in range(auctions)])
+    db.session.commit()
+    product_ids = [product.id for product in Product.query.order_by(Product.id)]
+    return bidder_ids, product_ids
+
+
+def run(mode, auctions, bidders, step, limits, seed_value):
+    from app import create_app
+    from commands import init_database
+    from models import db
+    from models.product import Product, Bid
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'war.db'),
+                          'TESTING': True, 'PAGE_CACHE_TTL': 0, 'BID_RATE_PER_SECOND': 0})
+        with app.app_context():
+            init_database()
+            bidder_ids, product_ids = seed(db, auctions, bidders)
+            engine = db.engine
+
+        clients = []
+        for i in range(bidders):
+            client = app.test_client()
+            client.post('/login', data={'email': f'war{i + 1}@bench.local', 'password': PASSWORD})
+            clients.append(client)
+
+        commits = [0]
+
+        def count_commit(conn):
+            commits[0] += 1
+
+        rng = random.Random(seed_value)
+        requests = 0
+        event.listen(engine, 'commit', count_commit)
+        started = time.perf_counter()
+        for product_id, auction_limits in zip(product_ids, limits):
+            order = list(range(bidders))
+            rng.shuffle(order)
+            if mode == 'proxy':
+                for i in order:
+                    clients[i].post(f'/product/max-bid/{product_id}', data={'max_amount': auction_limits[i]})
+                    requests += 1
+                continue
+            price, leader = STARTING_PRICE, None
+            while True:
+                moved = False
+                for i in order:
+                    if leader == i or price + step > auction_limits[i]:
+                        continue
+                    result = clients[i].post(f'/product/bid/{product_id}',
+                                             data={'bid_amount': price + step}).get_json()
+                    requests += 1
+                    if result['success']:
+                        price, leader, moved = result['new_price'], i, True
+                if not moved:
+                    break
+        elapsed = time.perf_counter() - started
+        event.remove(engine, 'commit', count_commit)
+
+        with app.app_context():
+            winners = [db.session.get(Product, product_id).highest_bidder_id for product_id in product_ids]
+            bid_rows = Bid.query.count()
+            db.engine.dispose()
+
+    return {
+        'mode': mode,
+        'auctions': auctions,
+        'bidders': bidders,
+        'requests_per_auction': round(requests / auctions, 1),
+        'commits_per_auction': round(commits[0] / auctions, 1),
+        'bids_per_auction': round(bid_rows / auctions, 1),
+        'ms_per_auction': round(elapsed / auctions * 1000, 1),
+        'winners': [bidder_ids.index(winner) if winner in bidder_ids else None for winner in winners],
+    }
+
+
+def tie_case(write_mode):
+    """One bidder sets a maximum of 50, another bids exactly 50; the maximum must keep the lead."""
+    from app import create_app
+    from commands import init_database
+    from models import db
+    from models.product import Product
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'tie.db'),
+                          'TESTING': True, 'PAGE_CACHE_TTL': 0, 'BID_RATE_PER_SECOND': 0,
+                          'BID_WRITE_MODE': write_mode})
+        with app.app_context():
+            init_database()
+            (max_bidder, plain_bidder), (product_id,) = seed(db, 1, 2)
+        clients = []
+        for i in (1, 2):
+            client = app.test_client()
+            client.post('/login', data={'email': f'war{i}@bench.local', 'password': PASSWORD})
+            clients.append(client)
+
+        clients[0].post(f'/product/max-bid/{product_id}', data={'max_amount': 50})
+        result = clients[1].post(f'/product/bid/{product_id}', data={'bid_amount': 50}).get_json()
+        with app.app_context():
+            product = db.session.get(Product, product_id)
+            leader, price = product.highest_bidder_id, product.current_price
+            db.engine.dispose()
+
+    return {'tie_mode': write_mode, 'plain_bid_accepted': result['success'], 'plain_bid_leading': result['leading'],
+            'price': price, 'held_by_maximum': leader == max_bidder and price == 50.0 and not result['leading']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--auctions', type=int, default=20)
+    parser.add_argument('--bidders', type=int, default=5, help='competing bidders per auction')
+    parser.add_argument('--step', type=float, default=1.0, help='manual bidders raise by this much')
+    parser.add_argument('--max-limit', type=float, default=500.0, help='private limits are drawn up to this')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Whole amounts, distinct per auction, so ties cannot decide the comparison
+    limits = [[float(limit) for limit in rng.sample(range(int(STARTING_PRICE) + 20, int(args.max_limit)),
+                                                     args.bidders)]
+              for _ in range(args.auctions)]
+    results = [run(mode, args.auctions, args.bidders, args.step, limits, args.seed)
+               for mode in ('manual', 'proxy')]
+    same_winners = results[0].pop('winners') == results[1].pop('winners')
+    for result in results:
+        print(json.dumps(result))
+    manual, proxy = results
+    print(json.dumps({'commit_reduction': round(manual['commits_per_auction'] / proxy['commits_per_auction'], 1),
+                      'same_winners': same_winners}))
+    ties = [tie_case(write_mode) for write_mode in ('direct', 'group')]
+    for tie in ties:
+        print(json.dumps(tie))
+    if not all(tie['held_by_maximum'] for tie in ties):
+        raise SystemExit('tie rule broken: a plain bid equal to a standing maximum took the lead')
+
+
+if __name__ == '__main__':
+    main()
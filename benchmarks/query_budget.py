@@ -0,0 +1,121 @@
+"""SQL query budget check for the listing views.
+
+Seeds a throwaway SQLite database, requests each listing view through the
+Flask test client and counts the SQL statements it issues. The data is then
+grown and the views are measured again. Exits non-zero when a view goes over
+its budget or when its query count grows with the data (an N+1).
+
+    python benchmarks/query_budget.py --small 10 --large 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Statements per request. The session user and the categories come from
+# process-local caches; budgets leave room for the user lookup so they hold
+# with USER_CACHE_TTL=0 too. Paginated views also pay for their totals.
+BUDGETS = {
+    'home': ('/', 3),
+    'products_by_category': ('/category/{category_id}', 3),
+    'dashboard': ('/dashboard', 5),
+    'admin.dashboard': ('/admin/dashboard', 7),
+    'admin.products': ('/admin/products', 2),
+    'admin.categories': ('/admin/categories', 3),
+    'database_info': ('/admin/database-info', 3),
+    'search': ('/search?q=listing', 4),
+}
+
+
+def grow(db, User, Category, Product, Bid, products):
+    """Add ``products`` listings with a few bids each, some sold or bid on by the admin."""
+    admin = User.query.filter_by(email='admin@auction.com').first()
+    categories = Category.query.all()
+    offset = User.query.count()
+    sellers = [User(username=f'seller{offset + i}', email=f'seller{offset + i}@bench.local',
+                    password_hash='x') for i in range(5)]
+    db.session.add_all(sellers)
+    db.session.flush()
+
+    end_time = datetime.utcnow() + timedelta(days=3)
+    listings = []
+    for i in range(products):
+        seller = admin if i % 4 == 0 else sellers[i % len(sellers)]
+        listings.append(Product(name=f'Listing {offset}-{i}', description='Bench listing',
+                                starting_price=10.0, current_price=10.0, end_time=end_time,
+                                seller_id=seller.id, category_id=categories[i % len(categories)].id))
+    db.session.add_all(listings)
+    db.session.flush()
+
+    for i, product in enumerate(listings):
+        bidders = [s for s in sellers + [admin] if s.id != product.seller_id][:3]
+        for step, bidder in enumerate(bidders, start=1):
+            db.session.add(Bid(amount=10.0 + step, user_id=bidder.id, product_id=product.id))
+        product.current_price = 10.0 + len(bidders)
+        product.bid_count = len(bidders)
+    db.session.commit()
+
+
+def measure(app, db, client, category_id):
+    from services.page_cache import page_cache
+    from utils.query_counter import QueryCounter
+
+    counts = {}
+    with app.app_context():
+        engine = db.engine
+    for name, (url, _) in BUDGETS.items():
+        url = url.format(category_id=category_id)
+        client.get(url)  # warm process-local caches, we budget the steady state
+        page_cache.clear()  # but count the page cache's miss path
+        with QueryCounter(engine) as counter:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise SystemExit(f'{name}: unexpected status {response.status_code}')
+        counts[name] = counter.count
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--small', type=int, default=10, help='listings for the first pass')
+    parser.add_argument('--large', type=int, default=200, help='listings added for the second pass')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'budget.db')
+    from app import app, db, User, Category, Product, Bid
+    from commands import init_database
+
+    app.config['TESTING'] = True
+    with app.app_context():
+        init_database()
+    client = app.test_client()
+    client.post('/login', data={'email': 'admin@auction.com', 'password': 'admin123'})
+
+    with app.app_context():
+        grow(db, User, Category, Product, Bid, args.small)
+        category_id = Category.query.first().id
+    small = measure(app, db, client, category_id)
+
+    with app.app_context():
+        grow(db, User, Category, Product, Bid, args.large)
+    large = measure(app, db, client, category_id)
+
+    failures = 0
+    print(f'{"view":<24}{"budget":>8}{"small":>8}{"large":>8}')
+    for name, (_, budget) in BUDGETS.items():
+        status = 'ok'
+        if large[name] > small[name]:
+            status = 'FAIL: grows with data'
+        elif large[name] > budget:
+            status = 'FAIL: over budget'
+        failures += status != 'ok'
+        print(f'{name:<24}{budget:>8}{small[name]:>8}{large[name]:>8}  {status}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""EXPLAIN QUERY PLAN check for the hot route queries.
+
+Requests each hot route on a seeded throwaway SQLite database, captures the
+SQL it actually issues and runs EXPLAIN QUERY PLAN on every statement. A
+route fails when it full-scans ``products`` or ``bids`` or when its expected
+index is not used. Exits non-zero on failure.
+
+    python benchmarks/query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+# route name -> (url, indexes its queries must use). A tuple lists
+# alternatives: with LIMIT 8 the planner may walk ix_products_created
+# newest-first and stop early instead of sorting the active range.
+ROUTES = {
+    'home': ('/', [('ix_products_active_end_created', 'ix_products_created')]),
+    'products_by_category': ('/category/{category_id}', ['ix_products_category_created']),
+    'dashboard': ('/dashboard', ['ix_products_seller_created', 'ix_bids_user_created']),
+    'view_product': ('/product/{product_id}', ['ix_bids_product_created']),
+    'product.bid_history': ('/product/{product_id}/bids', ['ix_bids_product_created']),
+    'user_bid_history': ('/users/{user_id}/bids', ['ix_bids_user_created']),
+    'admin.products': ('/admin/products', ['ix_products_created']),
+}
+
+FULL_SCAN = re.compile(r'\bSCAN (products|bids)\b(?! USING)')
+
+
+def _alternatives(index):
+    return index if isinstance(index, tuple) else (index,)
+
+
+def capture(engine, client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    if response.status_code != 200:
+        raise SystemExit(f'{url}: unexpected status {response.status_code}')
+    return statements
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'plans.db')
+    from app import app, db, User, Category, Product, Bid
+    from benchmarks.query_budget import grow
+    from commands import init_database
+
+    app.config['TESTING'] = True
+    with app.app_context():
+        init_database()
+    client = app.test_client()
+    client.post('/login', data={'email': 'admin@auction.com', 'password': 'admin123'})
+
+    with app.app_context():
+        grow(db, User, Category, Product, Bid, 200)
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        category_id = Category.query.first().id
+        product_id = Product.query.filter(Product.bid_count > 0).first().id
+        user_id = User.query.filter_by(email='admin@auction.com').first().id
+        engine = db.engine
+
+    failures = 0
+    for name, (url, expected) in ROUTES.items():
+        url = url.format(category_id=category_id, product_id=product_id, user_id=user_id)
+        plans = [explain(engine, statement, parameters)
+                 for statement, parameters in capture(engine, client, url)]
+        details = [detail for plan in plans for detail in plan]
+        scans = [detail for detail in details if FULL_SCAN.search(detail)]
+        missing = [index for index in expected
+                   if not any(name in detail for name in _alternatives(index) for detail in details)]
+
+        print(f'{name} ({url})')
+        for detail in details:
+            print(f'    {detail}')
+        if scans or missing:
+            failures += 1
+            print(f'  FAIL: full scans {scans}, unused indexes {missing}')
+        else:
+            print(f'  ok: uses {", ".join(" or ".join(_alternatives(index)) for index in expected)}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Full-text search benchmark.
+
+Builds a throwaway SQLite catalog of ``--products`` open listings from a
+small vocabulary, builds the FTS5 index in one pass and times
+``search_products`` (ranked page plus all facet counts) for a mix of
+common, rare, multi-word, prefix and filtered queries. Reports index build
+time and query latency p50/p99, and exits non-zero when p99 is over the
+``--target-ms`` budget. Each timed call starts after a ``gc.collect()``,
+so a collection the earlier rounds built up is not charged to one query
+(``timeit`` keeps the collector out for the same reason). The default run is the million-listing catalog;
+seeding it takes a few minutes.
+
+    python benchmarks/search.py
+    python benchmarks/search.py --products 100000 --rounds 50
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, text
+from models import db
+from models.user import User
+from models.category import Category
+from models.product import Product
+from services.search import create_search_index, search_products
+from benchmarks.bid_storm import percentile
+
+ADJECTIVES = ['vintage', 'handmade', 'antique', 'organic', 'professional', 'wooden', 'brass', 'silk',
+              'industrial', 'portable', 'traditional', 'rare', 'heavy', 'compact', 'painted', 'leather']
+NOUNS = ['drill', 'saree', 'poster', 'journal', 'lamp', 'camera', 'guitar', 'table', 'idol', 'pickle',
+         'sewing', 'machine', 'speaker', 'planter', 'bicycle', 'watch', 'rug', 'kettle', 'chair', 'tent']
+FILLER = ['condition', 'excellent', 'delivery', 'available', 'pune', 'mumbai', 'original', 'box',
+          'warranty', 'used', 'new', 'set', 'pieces', 'perfect', 'gift', 'collection', 'quality']
+
+QUERIES = [
+    ('common', {'query': 'vintage'}),
+    ('common_two_words', {'query': 'vintage lamp'}),
+    ('rare', {'query': 'brass kettle warranty'}),
+    ('prefix', {'query': 'prof'}),
+    ('no_match', {'query': 'zeppelin'}),
+    ('category_filter', {'query': 'handmade', 'category_id': 3}),
+    ('price_filter', {'query': 'camera', 'price': '2000-10000'}),
+    ('ending_soon', {'query': 'drill', 'ending_soon': True}),
+    ('deep_page', {'query': 'used', 'page': 40}),
+]
+
+
+def make_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def vocabulary(size, rng):
+    """Pseudo-words for descriptions, drawn with Zipf weights like real listing text."""
+    syllables = ['ka', 'ri', 'to', 'ne', 'sa', 'mu', 'lo', 'pe', 'di', 'va', 'gu', 'ha', 'zo', 'be', 'ch']
+    words = sorted({''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(size * 2)})
+    rng.shuffle(words)
+    words = words[:size]
+    # Cumulative, so choices() does not re-add 5000 weights for every listing
+    return words, list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+
+def listing(rng, words, cum_weights):
+    name = f'{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)}'
+    text_words = rng.choices(words, cum_weights=cum_weights, k=10) + rng.sample(FILLER, 2)
+    rng.shuffle(text_words)
+    return name, ' '.join(text_words).capitalize() + '.'
+
+
+def seed(products, rng, chunk=10000):
+    seller = User(username='seller', email='seller@bench.local', password_hash='x')
+    categories = [Category(name=f'Category {i}') for i in range(10)]
+    db.session.add_all([seller] + categories)
+    db.session.commit()
+
+    words, cum_weights = vocabulary(5000, rng)
+    now = datetime.utcnow()
+    for start in range(0, products, chunk):
+        rows = []
+        for _ in range(min(chunk, products - start)):
+            name, description = listing(rng, words, cum_weights)
+            price = round(rng.lognormvariate(7, 1.2), 2)
+            rows.append({'name': name, 'description': description, 'starting_price': price,
+                         'current_price': price, 'is_active': True,
+                         'end_time': now + timedelta(hours=rng.uniform(1, 24 * 30)),
+                         'seller_id': seller.id, 'category_id': rng.choice(categories).id,
+                         'created_at': now})
+        db.session.execute(insert(Product), rows)
+        db.session.commit()
+
+
+def run(products=1000000, rounds=20, target_ms=50.0, seed_value=1):
+    rng = random.Random(seed_value)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'search.db'))
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed(products, rng)
+            load_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with db.engine.begin() as conn:
+                create_search_index(conn)
+                conn.execute(text('ANALYZE'))
+            build_s = time.perf_counter() - started
+
+            report = {'products': products, 'rounds': rounds, 'target_ms': target_ms,
+                      'load_s': round(load_s, 2), 'index_build_s': round(build_s, 2), 'queries': {}}
+            all_timings = []
+            for label, kwargs in QUERIES:
+                timings = []
+                for _ in range(rounds):
+                    gc.collect()
+                    started = time.perf_counter()
+                    results = search_products(**kwargs)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    db.session.rollback()
+                all_timings.extend(timings)
+                report['queries'][label] = {
+                    'hits': results.total,
+                    'capped': results.capped,
+                    'p50_ms': round(percentile(timings, 50), 2),
+                    'p99_ms': round(percentile(timings, 99), 2),
+                }
+            report['p50_ms'] = round(percentile(all_timings, 50), 2)
+            report['p99_ms'] = round(percentile(all_timings, 99), 2)
+            report['within_target'] = report['p99_ms'] <= target_ms
+            db.engine.dispose()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--rounds', type=int, default=20, help='timed runs per query')
+    parser.add_argument('--target-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    report = run(args.products, args.rounds, args.target_ms)
+    print(json.dumps(report, indent=2))
+    if not report['within_target']:
+        raise SystemExit(f"search p99 {report['p99_ms']} ms is over the {args.target_ms} ms target")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Cold-start benchmark: app import time, first request and import breakdown.
+
+Every measurement runs in a fresh interpreter against a throwaway database
+that ``flask --app app init-db`` has already set up, which is how a worker
+starts in production. Reports the median and worst ``import app`` time, the
+first request after it (lazy initialisation lands there) and where import
+time goes, summed per top-level package from ``python -X importtime``.
+``--gunicorn`` also times gunicorn from launch to its first answer, with
+and without ``--preload``. Exits non-zero when the median import exceeds
+``--budget-ms``.
+
+    python benchmarks/startup.py --runs 7
+    python benchmarks/startup.py --gunicorn --workers 4
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OWN_PACKAGES = {'app', 'commands', 'config', 'models', 'routes', 'services', 'utils'}
+
+PROBE = '''
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get('/').status_code
+answered = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (answered - imported) * 1000,
+                  'status': status}))
+'''
+
+
+def run_probe(env):
+    started = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=ROOT, env=env, text=True,
+                                     stderr=subprocess.DEVNULL)
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def import_breakdown(env, top=10):
+    """Self time per top-level package and the slowest modules, from -X importtime."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, env=env,
+                            capture_output=True, text=True).stderr
+    packages, modules = defaultdict(float), []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        packages[name.split('.')[0]] += int(self_us) / 1000
+        modules.append((int(self_us) / 1000, name))
+    modules.sort(reverse=True)
+    return {
+        'own_ms': round(sum(ms for package, ms in packages.items() if package in OWN_PACKAGES), 1),
+        'packages_ms': {package: round(ms, 1) for package, ms in
+                        sorted(packages.items(), key=lambda item: -item[1])[:top]},
+        'slowest_modules_ms': {name: round(ms, 1) for ms, name in modules[:top]},
+    }
+
+
+def gunicorn_boot(env, workers, preload, port):
+    """Seconds from launching gunicorn until it first answers a request."""
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+               '--log-level', 'warning', 'app:app'] + (['--preload'] if preload else [])
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                connection.request('GET', '/login')
+                status = connection.getresponse().status
+                connection.close()
+                if status == 200:
+                    return round(time.perf_counter() - started, 2)
+            except OSError:
+                time.sleep(0.02)
+            if process.poll() is not None:
+                raise SystemExit('gunicorn exited during startup')
+        raise SystemExit('gunicorn did not answer within 60s')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--budget-ms', type=float, default=1000, help='limit for the median import time')
+    parser.add_argument('--gunicorn', action='store_true', help='also time gunicorn boot with and without --preload')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'startup.db'))
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=ROOT, env=env,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        run_probe(env)  # warm the OS file cache and __pycache__
+        runs = [run_probe(env) for _ in range(args.runs)]
+        if any(run['status'] != 200 for run in runs):
+            raise SystemExit(f"First request failed with status {runs[0]['status']}")
+
+        report = {'runs': args.runs, 'budget_ms': args.budget_ms}
+        for key in ('import_ms', 'first_request_ms', 'process_ms'):
+            values = [run[key] for run in runs]
+            report[key] = {'median': round(statistics.median(values), 1), 'max': round(max(values), 1)}
+        report['imports'] = import_breakdown(env)
+        if args.gunicorn:
+            report['gunicorn_boot'] = {
+                'workers': args.workers,
+                'plain_s': gunicorn_boot(env, args.workers, False, args.port),
+                'preload_s': gunicorn_boot(env, args.workers, True, args.port),
+            }
+
+    print(json.dumps(report, indent=2))
+    over = report['import_ms']['median'] > args.budget_ms
+    if over:
+        print(f"FAIL: median import {report['import_ms']['median']} ms is over the {args.budget_ms} ms budget",
+              file=sys.stderr)
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
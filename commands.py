@@ -0,0 +1,114 @@
+import os
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from models.user import User
+from models.stats import CategoryStats
+from models.migrations import seed_defaults, upgrade
+from services.bidding import refresh_bid_stats
+from services.imports import FORMATS as IMPORT_FORMATS, CHUNK_SIZE, detect_format, import_listings
+from services.scheduler import auction_closer
+from services.search import rebuild_search_index
+from services.stats import materialized_enabled, refresh_category_stats
+
+
+def init_database():
+    """Create or upgrade the schema and add the default admin and categories.
+
+    Run once per deploy (``flask --app app init-db``), not by every worker.
+    Returns ``(added, seeded)``: schema objects and default rows created.
+    """
+    added = upgrade()
+    if 'products.bid_count' in added:
+        refresh_bid_stats()
+    if materialized_enabled() and CategoryStats.query.first() is None:
+        refresh_category_stats()
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    return added, seed_defaults()
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create or upgrade the database and seed the defaults."""
+    added, seeded = init_database()
+    print(f"Database upgraded, added: {', '.join(added)}" if added else "Database schema is up to date")
+    if 'admin' in seeded:
+        print("Default admin user created: admin@auction.com / admin123")
+    if 'categories' in seeded:
+        print("Default categories created")
+
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db():
+    """Add missing tables, columns and indexes to an existing database."""
+    added = upgrade()
+    if 'products.bid_count' in added:
+        refresh_bid_stats()
+    print(f"Added: {', '.join(added)}" if added else "Database is up to date")
+
+
+@click.command('repair-bid-stats')
+@with_appcontext
+def repair_bid_stats():
+    """Backfill or repair the denormalized bid columns on products."""
+    upgrade()
+    updated = refresh_bid_stats()
+    print(f"Bid stats refreshed for {updated} products")
+
+
+@click.command('refresh-stats')
+@with_appcontext
+def refresh_stats():
+    """Rebuild the materialized per-category stats table."""
+    rows = refresh_category_stats()
+    print(f"Category stats rebuilt for {rows} categories")
+
+
+@click.command('rebuild-search')
+@with_appcontext
+def rebuild_search():
+    """Rebuild the full-text search index from the products table."""
+    upgrade()
+    rebuild_search_index()
+    print("Search index rebuilt")
+
+
+@click.command('import-listings')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--seller', required=True, help='Email of the user the listings belong to.')
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True, help='Rows per transaction.')
+@with_appcontext
+def bulk_import(path, seller, fmt, chunk_size):
+    """Bulk import listings from a CSV or JSONL file."""
+    user = User.query.filter_by(email=seller).first()
+    if user is None:
+        raise click.ClickException(f'No user with email {seller}')
+    fmt = fmt or detect_format(path)
+    if fmt is None:
+        raise click.ClickException('Cannot tell the format from the file name, pass --format')
+    with open(path, 'rb') as stream:
+        report = import_listings(stream, fmt, user.id, chunk_size)
+    for error in report.errors:
+        print(f"line {error['line']}: {error['error']}")
+    print(f"Imported {report.inserted} of {report.rows} rows, {report.failed} failed")
+
+
+@click.command('close-auctions')
+@click.option('--once', is_flag=True, help='Close auctions that are already due and exit.')
+@with_appcontext
+def close_auctions(once):
+    """Close ended auctions and record their winning bids."""
+    if once:
+        print(f"Closed {auction_closer.run_pending()} auctions")
+        return
+    print("Auction closer running, press Ctrl+C to stop")
+    try:
+        auction_closer.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+COMMANDS = [init_db, upgrade_db, repair_bid_stats, refresh_stats, rebuild_search, bulk_import, close_auctions]
@@ -3,17 +3,142 @@ from datetime import timedelta
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+# Database engine profiles. SQLite pragmas are applied to every new
+# connection; the pool settings go to create_engine. 'legacy' is what
+# SQLite and SQLAlchemy do out of the box: rollback journal, so a bid
+# write blocks every reader.
+DATABASE_PROFILES = {
+    'legacy': {},
+    'wal': {
+        'journal_mode': 'WAL',       # readers no longer wait for the writer
+        'synchronous': 'NORMAL',     # fsync at checkpoints only; safe with WAL
+        'busy_timeout': 5000,        # ms to wait for the write lock before "database is locked"
+        'cache_size': -16000,        # KiB, i.e. 16 MB of page cache per connection
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_recycle': 3600,
+    },
+    'wal-mmap': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -65536,
+        'mmap_size': 268435456,      # read pages straight from a 256 MB memory map
+        'temp_store': 'MEMORY',
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_recycle': 3600,
+    },
+}
+
+
+def env_flag(name, default=False):
+    value = os.environ.get(name)
+    return default if value is None else value.lower() in ('1', 'true', 'yes')
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'auction.db')
+    # Relative SQLite paths resolve against the instance folder
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///auction.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = os.path.join(basedir, '..', 'static', 'uploads')
+    UPLOAD_FOLDER = os.path.normpath(os.path.join(basedir, '..', 'static', 'uploads'))
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
-    
-    # Ensure upload directory exists
-    @staticmethod
-    def init_app(app):
-        if not os.path.exists(Config.UPLOAD_FOLDER):
-            os.makedirs(Config.UPLOAD_FOLDER)
+
+    DATABASE_PROFILES = DATABASE_PROFILES
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'wal')
+    # Give read-only views their own pool of query_only connections
+    DATABASE_READ_POOL = env_flag('DATABASE_READ_POOL')
+    DATABASE_READ_POOL_SIZE = int(os.environ.get('DATABASE_READ_POOL_SIZE', 10))
+
+    # Upload renditions: JPEG or WEBP, rendered on a 'thread' or 'process' pool
+    # ('sync' renders inside the request)
+    IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'JPEG')
+    IMAGE_EXECUTOR = os.environ.get('IMAGE_EXECUTOR', 'thread')
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+    # Keep per-category stats in a table updated on every write instead of
+    # aggregating products on each request
+    MATERIALIZED_STATS = env_flag('MATERIALIZED_STATS')
+
+    # Run the auction-close scheduler on a thread in each web process. Prefer
+    # a single separate worker: flask --app app close-auctions
+    AUCTION_CLOSER_THREAD = env_flag('AUCTION_CLOSER_THREAD')
+
+    # Password hashing: a Werkzeug method with its cost, e.g. 'scrypt',
+    # 'scrypt:16384:8:1' or 'pbkdf2:sha256:600000'. Older hashes are
+    # replaced on the next successful login. Hashes run on a pool of
+    # PASSWORD_HASH_WORKERS threads per process; PASSWORD_HASH_QUEUE more may
+    # wait, beyond that logins get a 503 ('sync' hashes on the request thread)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+
+    # Admission control on the bid endpoints: every user gets BID_RATE_BURST
+    # bids per product at once, refilled at BID_RATE_PER_SECOND (0 disables);
+    # excess requests get a 429 with retry_after. RATE_LIMIT_BACKEND 'local'
+    # keeps the buckets per process, 'sqlite' shares them between workers on
+    # one host. A max bid stands until the auction closes, so the max-bid
+    # endpoint has its own, smaller MAX_BID_RATE_BURST on the same refill
+    BID_RATE_PER_SECOND = float(os.environ.get('BID_RATE_PER_SECOND', 2))
+    BID_RATE_BURST = int(os.environ.get('BID_RATE_BURST', 5))
+    MAX_BID_RATE_BURST = int(os.environ.get('MAX_BID_RATE_BURST', 2))
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'local')
+
+    # BID_WRITE_MODE 'direct' commits every bid in its own transaction;
+    # 'group' hands bids to one writer thread per worker, which validates
+    # them in arrival order and commits up to BID_GROUP_MAX_BATCH at a time,
+    # waiting up to BID_GROUP_MAX_WAIT_MS for a batch to fill (0 takes
+    # whatever queued while the previous commit ran). A request waits at
+    # most BID_GROUP_TIMEOUT seconds for the writer to take its bid before
+    # it is withdrawn and answered busy
+    BID_WRITE_MODE = os.environ.get('BID_WRITE_MODE', 'direct')
+    BID_GROUP_MAX_BATCH = int(os.environ.get('BID_GROUP_MAX_BATCH', 64))
+    BID_GROUP_MAX_WAIT_MS = float(os.environ.get('BID_GROUP_MAX_WAIT_MS', 0))
+    BID_GROUP_TIMEOUT = float(os.environ.get('BID_GROUP_TIMEOUT', 5))
+
+    # Live bid events: 'local' (this process only) or 'sqlite' (shared spool
+    # file, for several gunicorn workers on one host)
+    EVENT_BACKEND = os.environ.get('EVENT_BACKEND', 'local')
+
+    # Pages only open Server-Sent Event streams with LIVE_UPDATES on. Every
+    # open stream holds a worker thread for up to SSE_MAX_SECONDS, so turn
+    # it on only with threaded or gevent workers to spare
+    LIVE_UPDATES = env_flag('LIVE_UPDATES')
+    SSE_MAX_SECONDS = int(os.environ.get('SSE_MAX_SECONDS', 55))
+
+    # Rendered home/category listings are cached per worker for up to
+    # PAGE_CACHE_TTL seconds (0 disables) and dropped as soon as a bid,
+    # listing or admin change touches them
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 30))
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 512))
+
+    # The logged-in user is cached per worker for USER_CACHE_TTL seconds
+    # (0 loads it on every request) and dropped when its account changes.
+    # USER_SESSION_CLAIMS also keeps it in the session cookie for that long,
+    # so no worker has to look it up
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_SESSION_CLAIMS = env_flag('USER_SESSION_CLAIMS')
+
+    # Per-endpoint request, SQL and template timings, served in Prometheus
+    # text format at /metrics to admins or to requests carrying
+    # 'Authorization: Bearer <METRICS_TOKEN>'. Each worker reports its own
+    METRICS_ENABLED = env_flag('METRICS_ENABLED', default=True)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Statements taking at least SLOW_QUERY_MS (0 disables) are kept, the
+    # last SLOW_QUERY_LOG_SIZE of them, with their route and, once per
+    # distinct statement, SQLite's query plan; see /admin/slow-queries
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 500))
+    SLOW_QUERY_EXPLAIN = env_flag('SLOW_QUERY_EXPLAIN', default=True)
+
+    # An admin can profile one request by sending 'X-Profile: 1' or adding
+    # ?_profile=1; the pstats dump, collapsed stacks and a summary go to
+    # PROFILE_DIR (default instance/profiles), newest PROFILE_KEEP runs kept
+    PROFILER_ENABLED = env_flag('PROFILER_ENABLED', default=True)
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
@@ -8,9 +8,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import from the main app file
 from app import app, db, User, Product, Category
+from commands import init_database
+from services.category_cache import category_cache
+from services.page_cache import page_cache, HOME_TAG, category_tag
 
 def create_sample_data():
     with app.app_context():
+        init_database()
         print("🔄 Creating sample data for unique categories...")
         
         # First, create or update categories to match your structure
@@ -66,6 +70,7 @@ def create_sample_data():
                 print(f"✅ Created category: {cat_data['name']}")
         
         db.session.commit()
+        category_cache.invalidate()
         
         # Get all categories
         categories = {cat.name: cat for cat in Category.query.all()}
@@ -301,6 +306,7 @@ def create_sample_data():
                 print(f"✅ Created product: {product_data['name']}")
         
         db.session.commit()
+        page_cache.invalidate(HOME_TAG, *(category_tag(category.id) for category in categories.values()))
         print(f"🎉 Created {products_created} category-specific products")
         
         # Print summary
@@ -9,7 +9,7 @@ class Category(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
     # Relationships
-    products = db.relationship('Product', backref='category_rel', lazy='dynamic')
+    products = db.relationship('Product', backref='category', lazy='dynamic')
     
     def __repr__(self):
         return f'<Category {self.name}>'
\ No newline at end of file
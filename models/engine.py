@@ -0,0 +1,108 @@
+import os
+import weakref
+from functools import wraps
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+READ_BIND = 'read'
+PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store')
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_recycle', 'pool_timeout')
+
+# Every engine built by init_db; held weakly so discarded apps drop out
+_ENGINES = weakref.WeakSet()
+
+
+def _dispose_engines_in_child():
+    # A worker forked from a preloaded app must not reuse the parent's
+    # pooled connections; drop them in the child without closing them
+    for engine in list(_ENGINES):
+        engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_engines_in_child)
+
+
+def _is_sqlite_file(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def _pool_options(profile, url):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and not _is_sqlite_file(url):
+        return {}  # in-memory databases use a single static connection
+    return {name: profile[name] for name in POOL_OPTIONS if name in profile}
+
+
+def _pragma_listener(profile, query_only=False):
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name in PRAGMAS:
+            if name in profile:
+                cursor.execute(f'PRAGMA {name}={profile[name]}')
+        if query_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+    return apply_pragmas
+
+
+def init_db(app, db):
+    """Set up ``db`` for ``app`` with the engine profile named by DATABASE_PROFILE.
+
+    Pool settings become engine options, SQLite pragmas are run on every
+    new connection, and forked workers start with empty pools. With
+    DATABASE_READ_POOL on, a second engine on the same database (bind
+    ``read``) holds query_only connections for views decorated with
+    ``read_only``.
+    """
+    profiles = app.config.get('DATABASE_PROFILES', {})
+    name = app.config.get('DATABASE_PROFILE', 'legacy')
+    if name not in profiles:
+        raise ValueError(f"Unknown DATABASE_PROFILE {name!r}, "
+                         f"expected one of {', '.join(profiles)}")
+    profile = profiles[name]
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.update(_pool_options(profile, url))
+    if app.config.get('DATABASE_READ_POOL') and _is_sqlite_file(url):
+        read_options = dict(_pool_options(profile, url), url=url)
+        read_options['pool_size'] = app.config.get('DATABASE_READ_POOL_SIZE',
+                                                   read_options.get('pool_size', 5))
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[READ_BIND] = read_options
+
+    db.init_app(app)
+    with app.app_context():
+        engines = dict(db.engines)
+    _ENGINES.update(engines.values())
+    if make_url(url).get_backend_name() != 'sqlite':
+        return
+    for key, engine in engines.items():
+        event.listen(engine, 'connect', _pragma_listener(profile, query_only=key == READ_BIND))
+
+
+def read_only(view):
+    """Run the view's queries on the read pool, when there is one."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only_db = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Sends a read-only view's SELECTs to the read bind.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary
+    engine, so a view that turns out to write still works.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get('read_only_db') \
+                and not getattr(clause, 'is_dml', False):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,75 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from models import db
+
+
+def upgrade():
+    """Bring an existing database up to the current models.
+
+    Creates missing tables, adds columns that were introduced after the
+    database was created and builds any missing indexes, including the
+    full-text search index. Safe to run on every start. Returns the list of
+    ``table.column`` and index names added.
+    """
+    db.create_all()
+    inspector = inspect(db.engine)
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                added.append(f'{table.name}.{column.name}')
+
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    added.append(index.name)
+
+        from services.search import SEARCH_TABLE, create_search_index
+        if create_search_index(conn):
+            added.append(SEARCH_TABLE)
+
+        if added and db.engine.dialect.name == 'sqlite':
+            # Refresh planner statistics so the new indexes get picked up
+            conn.execute(text('ANALYZE'))
+    return added
+
+
+DEFAULT_ADMIN = {'username': 'admin', 'email': 'admin@auction.com', 'password': 'admin123'}
+DEFAULT_CATEGORIES = [
+    ('Electronics', 'Electronic devices and accessories'),
+    ('Fashion', 'Clothing and fashion items'),
+    ('Home & Garden', 'Home and garden products'),
+    ('Sports', 'Sports equipment and gear'),
+    ('Collectibles', 'Rare and collectible items'),
+]
+
+
+def seed_defaults():
+    """Add the default admin user and, on an empty table, the default categories.
+
+    Returns what was added, e.g. ``['admin', 'categories']``.
+    """
+    from models.user import User
+    from models.category import Category
+    from services.category_cache import category_cache
+
+    added = []
+    if User.query.filter_by(email=DEFAULT_ADMIN['email']).first() is None:
+        admin = User(username=DEFAULT_ADMIN['username'], email=DEFAULT_ADMIN['email'], is_admin=True)
+        admin.set_password(DEFAULT_ADMIN['password'])
+        db.session.add(admin)
+        added.append('admin')
+    if Category.query.first() is None:
+        db.session.add_all(Category(name=name, description=description)
+                           for name, description in DEFAULT_CATEGORIES)
+        added.append('categories')
+    db.session.commit()
+    if 'categories' in added:
+        category_cache.invalidate()
+    return added
@@ -3,6 +3,12 @@ from models import db
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_active_end_created', 'is_active', 'end_time', 'created_at'),
+        db.Index('ix_products_category_created', 'category_id', 'created_at'),
+        db.Index('ix_products_seller_created', 'seller_id', 'created_at'),
+        db.Index('ix_products_created', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -14,12 +20,30 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     is_active = db.Column(db.Boolean, default=True)
     
+    # Denormalized bid stats, maintained by the bid engine
+    bid_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    highest_bidder_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    last_bid_at = db.Column(db.DateTime)
+    
+    # Set by the auction-close scheduler once end_time has passed
+    closed_at = db.Column(db.DateTime)
+    winning_bid_id = db.Column(db.Integer, db.ForeignKey('bids.id', use_alter=True,
+                                                         name='fk_products_winning_bid_id'))
+    
     # Foreign Keys
     seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     
     # Relationships
-    bids = db.relationship('Bid', backref='product', lazy='dynamic', order_by='Bid.amount.desc()')
+    bids = db.relationship('Bid', backref='product', lazy='dynamic', order_by='Bid.amount.desc()',
+                           foreign_keys='Bid.product_id')
+    winning_bid = db.relationship('Bid', foreign_keys=[winning_bid_id], post_update=True)
+    
+    @classmethod
+    def count_by_category(cls):
+        """Map category id to product count with a single GROUP BY query."""
+        rows = db.session.query(cls.category_id, db.func.count(cls.id)).group_by(cls.category_id)
+        return dict(rows.all())
     
     @property
     def time_remaining(self):
@@ -37,6 +61,11 @@ class Product(db.Model):
 
 class Bid(db.Model):
     __tablename__ = 'bids'
+    __table_args__ = (
+        db.Index('ix_bids_product_amount', 'product_id', 'amount'),
+        db.Index('ix_bids_product_created', 'product_id', 'created_at'),
+        db.Index('ix_bids_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
@@ -47,4 +76,28 @@ class Bid(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     
     def __repr__(self):
-        return f'<Bid ${self.amount} by User {self.user_id}>'
\ No newline at end of file
+        return f'<Bid ${self.amount} by User {self.user_id}>'
+
+class MaxBid(db.Model):
+    """A bidder's standing maximum for proxy bidding, one per user and product.
+
+    The engine in services.bidding bids on the owner's behalf up to
+    ``amount``; nobody else sees it. Rows are removed once the visible price
+    reaches them.
+    """
+    __tablename__ = 'max_bids'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'user_id', name='uq_max_bids_product_user'),
+        db.Index('ix_max_bids_product_amount', 'product_id', 'amount', 'placed_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    amount = db.Column(db.Float, nullable=False)
+    # Set again when the maximum is raised; the earlier of two equal maxima wins
+    placed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    
+    def __repr__(self):
+        return f'<MaxBid ${self.amount} by User {self.user_id}>'
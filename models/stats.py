@@ -0,0 +1,13 @@
+from models import db
+
+class CategoryStats(db.Model):
+    """Materialized per-category counters, maintained incrementally on writes."""
+    __tablename__ = 'category_stats'
+    
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    active_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    bid_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    def __repr__(self):
+        return f'<CategoryStats {self.category_id}: {self.product_count} products>'
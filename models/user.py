@@ -1,6 +1,6 @@
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from models import db
+from services.passwords import password_hasher
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -13,14 +13,24 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
     # Relationships
-    products = db.relationship('Product', backref='seller', lazy='dynamic')
+    products = db.relationship('Product', backref='seller', lazy='dynamic',
+                               foreign_keys='Product.seller_id')
     bids = db.relationship('Bid', backref='bidder', lazy='dynamic')
     
+    # Hashing runs on the capped pool in services.passwords and may raise
+    # HasherBusy when it is saturated
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def rehash_password(self, password):
+        """Re-hash with the configured method after a successful login; True if changed."""
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
     
     def __repr__(self):
         return f'<User {self.username}>'
\ No newline at end of file
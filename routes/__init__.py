@@ -1,9 +1,10 @@
+def register_blueprints(app):
+    from routes.main import main_bp
+    from routes.auth import auth_bp
+    from routes.product import product_bp
+    from routes.admin import admin_bp
 
-from flask import Blueprint
-
-main_bp = Blueprint('main', __name__)
-auth_bp = Blueprint('auth', __name__)
-admin_bp = Blueprint('admin', __name__)
-product_bp = Blueprint('product', __name__)
-
-from . import auth, admin, product
\ No newline at end of file
+    app.register_blueprint(main_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(product_bp, url_prefix='/product')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
@@ -1,20 +1,34 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, jsonify, abort, \
+    send_from_directory, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from datetime import datetime
 from models import db
+from models.engine import read_only
 from models.user import User
 from models.product import Product, Bid
 from models.category import Category
+from services.bid_history import EXPORT_FORMATS, EXPORT_MIMETYPES, export_bids
+from services.category_cache import category_cache
+from services.page_cache import page_cache, HOME_TAG, category_tag, product_tag
+from services.profiler import request_profiler
+from services.rate_limit import rate_limiter
+from services.slow_queries import slow_query_log
+from services.stats import database_stats
+from utils.pagination import keyset_paginate
 
 admin_bp = Blueprint('admin', __name__)
 
+PRODUCTS_PER_PAGE = 50
+
 @admin_bp.before_request
 def restrict_to_admin():
     if not current_user.is_authenticated or not current_user.is_admin:
         flash('Access denied. Admin privileges required.', 'error')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
 
 @admin_bp.route('/dashboard')
+@read_only
 def dashboard():
     total_users = User.query.count()
     total_products = Product.query.count()
@@ -23,7 +37,8 @@ def dashboard():
     
     # Recent activities
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
-    recent_products = Product.query.order_by(Product.created_at.desc()).limit(5).all()
+    recent_products = Product.query.options(joinedload(Product.seller)) \
+        .order_by(Product.created_at.desc()).limit(5).all()
     
     return render_template('admin/dashboard.html',
                          total_users=total_users,
@@ -34,15 +49,19 @@ def dashboard():
                          recent_products=recent_products)
 
 @admin_bp.route('/products')
+@read_only
 def products():
-    all_products = Product.query.order_by(Product.created_at.desc()).all()
-    categories = Category.query.all()
-    return render_template('admin/products.html', products=all_products, categories=categories)
+    all_products = keyset_paginate(
+        Product.query.options(joinedload(Product.seller), joinedload(Product.category)),
+        Product, request.args.get('cursor'), PRODUCTS_PER_PAGE)
+    return render_template('admin/products.html', products=all_products)
 
 @admin_bp.route('/categories')
+@read_only
 def categories():
     all_categories = Category.query.all()
-    return render_template('admin/categories.html', categories=all_categories)
+    return render_template('admin/categories.html', categories=all_categories,
+                           category_counts=Product.count_by_category())
 
 @admin_bp.route('/add_category', methods=['POST'])
 def add_category():
@@ -56,6 +75,8 @@ def add_category():
     category = Category(name=name, description=description)
     db.session.add(category)
     db.session.commit()
+    category_cache.invalidate()
+    page_cache.invalidate(HOME_TAG)
     
     flash('Category added successfully', 'success')
     return redirect(url_for('admin.categories'))
@@ -71,6 +92,8 @@ def delete_category(category_id):
     
     db.session.delete(category)
     db.session.commit()
+    category_cache.invalidate()
+    page_cache.invalidate(HOME_TAG, category_tag(category_id))
     
     flash('Category deleted successfully', 'success')
     return redirect(url_for('admin.categories'))
@@ -80,7 +103,162 @@ def toggle_product(product_id):
     product = Product.query.get_or_404(product_id)
     product.is_active = not product.is_active
     db.session.commit()
+    page_cache.invalidate(HOME_TAG, category_tag(product.category_id), product_tag(product.id))
     
     status = "activated" if product.is_active else "deactivated"
     flash(f'Product {status} successfully', 'success')
-    return redirect(url_for('admin.products'))
\ No newline at end of file
+    return redirect(url_for('admin.products'))
+
+@admin_bp.route('/database-info')
+@read_only
+def database_info():
+    return render_template('admin/database_info.html', **database_stats())
+
+@admin_bp.route('/rate-limits')
+def rate_limits():
+    # Admission-control counters of this worker process
+    return jsonify({'rate': rate_limiter.rate, 'burst': rate_limiter.burst,
+                    'scope_bursts': rate_limiter.bursts,
+                    'backend_errors': rate_limiter.errors, 'scopes': rate_limiter.stats()})
+
+@admin_bp.route('/slow-queries')
+def slow_queries():
+    # This worker's slow statements, grouped and ranked by total time
+    return render_template('admin/slow_queries.html', offenders=slow_query_log.offenders(),
+                           entries=slow_query_log.entries()[-20:][::-1], log=slow_query_log)
+
+@admin_bp.route('/slow-queries/clear', methods=['POST'])
+def clear_slow_queries():
+    slow_query_log.clear()
+    flash('Slow query log cleared', 'success')
+    return redirect(url_for('admin.slow_queries'))
+
+@admin_bp.route('/profiles')
+def profiles():
+    # Runs saved by this host's workers for requests sent with X-Profile: 1
+    return jsonify({'runs': [dict(run, urls=[url_for('admin.profile_file', filename=name) for name in run['files']])
+                             for run in request_profiler.runs()]})
+
+@admin_bp.route('/profiles/<filename>')
+def profile_file(filename):
+    if not filename.endswith(('.prof', '.collapsed', '.txt')):
+        abort(404)
+    return send_from_directory(request_profiler.folder, filename, as_attachment=filename.endswith('.prof'))
+
+@admin_bp.route('/bids/export')
+@read_only
+def export_all_bids():
+    # Streamed as it is read: ?format=csv (default) or jsonl
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Pass ?format=csv|jsonl'}), 400
+    return Response(stream_with_context(export_bids(fmt)), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=bids.{fmt}'})
+
+# Special Categories Management
+@admin_bp.route('/special-categories')
+def special_categories():
+    # This would come from a SpecialCategory model in a real implementation
+    # For now, we'll use static data
+    special_categories_data = [
+        {
+            'id': 1,
+            'name': 'Food & Homemade Products',
+            'why_it_matters': 'Home-based sellers get a digital platform',
+            'product_count': 15,
+            'status': 'Active',
+            'is_featured': False
+        },
+        {
+            'id': 2,
+            'name': 'Tools & Machinery',
+            'why_it_matters': 'OLX doesn\'t allow; Indiamart is too B2B-heavy',
+            'product_count': 28,
+            'status': 'Active',
+            'is_featured': False
+        },
+        {
+            'id': 3,
+            'name': 'Events & Rentals',
+            'why_it_matters': 'Huge demand for wedding/party rental items',
+            'product_count': 42,
+            'status': 'Growing',
+            'is_featured': False
+        },
+        {
+            'id': 4,
+            'name': 'Industrial & Wholesale',
+            'why_it_matters': 'Merges retail & bulk; ideal for small manufacturers',
+            'product_count': 67,
+            'status': 'Partner',
+            'is_featured': False
+        },
+        {
+            'id': 5,
+            'name': 'Travel & Tourism',
+            'why_it_matters': 'Book local cabs, rooms, and packages in one place',
+            'product_count': 23,
+            'status': 'Active',
+            'is_featured': False
+        },
+        {
+            'id': 6,
+            'name': 'Education & Coaching',
+            'why_it_matters': 'A hub for tutors, coaching, classes & materials',
+            'product_count': 34,
+            'status': 'Educational',
+            'is_featured': False
+        },
+        {
+            'id': 7,
+            'name': 'Plants & Gardening',
+            'why_it_matters': 'Gardening is trending - no OLX category exists for this',
+            'product_count': 19,
+            'status': 'Active',
+            'is_featured': False
+        },
+        {
+            'id': 8,
+            'name': 'Art, Collectibles & Antiques',
+            'why_it_matters': 'Vintage, rare items need a home - OLX blocks most',
+            'product_count': 56,
+            'status': 'Active',
+            'is_featured': False
+        },
+        {
+            'id': 9,
+            'name': 'DIY & Handmade',
+            'why_it_matters': 'Promote local craft & culture - Indian Etsy alternative',
+            'product_count': 89,
+            'status': 'Featured',
+            'is_featured': True
+        }
+    ]
+    
+    return render_template('admin/special_categories.html', 
+                         special_categories=special_categories_data)
+
+@admin_bp.route('/add-special-category', methods=['GET', 'POST'])
+def add_special_category():
+    if request.method == 'POST':
+        # Handle special category creation
+        name = request.form.get('name')
+        why_it_matters = request.form.get('why_it_matters')
+        status = request.form.get('status')
+        is_featured = bool(request.form.get('is_featured'))
+        
+        # In a real implementation, you would save to SpecialCategory model
+        flash(f'Special category "{name}" added successfully!', 'success')
+        return redirect(url_for('admin.special_categories'))
+    
+    return render_template('admin/add_special_category.html')
+
+@admin_bp.route('/edit-special-category/<int:category_id>')
+def edit_special_category(category_id):
+    flash('Edit functionality would be implemented here', 'info')
+    return redirect(url_for('admin.special_categories'))
+
+@admin_bp.route('/delete-special-category/<int:category_id>')
+def delete_special_category(category_id):
+    flash('Delete functionality would be implemented here', 'info')
+    return redirect(url_for('admin.special_categories'))
@@ -2,9 +2,23 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db
 from models.user import User
+from services.passwords import HasherBusy
+from services.user_cache import user_cache
 
 auth_bp = Blueprint('auth', __name__)
 
+BUSY_MESSAGE = 'Too many sign-in attempts right now, please try again in a moment'
+BUSY_RETRY_AFTER = 2  # seconds
+
+def hasher_busy(template):
+    # Every password hashing slot is taken: shed the request instead of queueing it
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        response = jsonify({'success': False, 'error': BUSY_MESSAGE})
+    else:
+        flash(BUSY_MESSAGE, 'error')
+        response = render_template(template)
+    return response, 503, {'Retry-After': str(BUSY_RETRY_AFTER)}
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
@@ -14,12 +28,25 @@ def login():
         
         user = User.query.filter_by(email=email).first()
         
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HasherBusy:
+            return hasher_busy('login.html')
+        
+        if valid:
+            # Hashes made with an older method or cost are upgraded in place;
+            # when the pool is saturated that waits for a later login
+            try:
+                if user.rehash_password(password):
+                    db.session.commit()
+            except HasherBusy:
+                pass
             login_user(user, remember=remember)
+            user_cache.remember(user)
             next_page = request.args.get('next')
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({'success': True, 'redirect': next_page or url_for('home')})
-            return redirect(next_page or url_for('home'))
+                return jsonify({'success': True, 'redirect': next_page or url_for('main.home')})
+            return redirect(next_page or url_for('main.home'))
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return jsonify({'success': False, 'error': 'Invalid email or password'})
@@ -54,7 +81,10 @@ def register():
             return render_template('register.html')
         
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HasherBusy:
+            return hasher_busy('register.html')
         
         # First user becomes admin
         if User.query.count() == 0:
@@ -64,11 +94,12 @@ def register():
         db.session.commit()
         
         login_user(user)
+        user_cache.remember(user)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            return jsonify({'success': True, 'redirect': url_for('home')})
+            return jsonify({'success': True, 'redirect': url_for('main.home')})
         flash('Registration successful!', 'success')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
     return render_template('register.html')
 
@@ -76,5 +107,6 @@ def register():
 @login_required
 def logout():
     logout_user()
+    user_cache.forget()
     flash('You have been logged out successfully.', 'success')
-    return redirect(url_for('home'))
\ No newline at end of file
+    return redirect(url_for('main.home'))
\ No newline at end of file
@@ -0,0 +1,119 @@
+from flask import Blueprint, Response, render_template, request, abort, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import joinedload
+from datetime import datetime
+from models import db
+from models.engine import read_only
+from models.product import Product, Bid
+from services.bid_history import MAX_PER_PAGE, PER_PAGE, page_to_dict, user_bids
+from services.category_cache import category_cache
+from services.events import event_hub, sse_stream, LISTING_CHANNEL, SSE_HEADERS
+from services.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from services.page_cache import page_cache, listing_fragment, HOME_TAG, category_tag
+from services.search import PRICE_BUCKETS, search_products
+from utils.pagination import keyset_paginate
+
+main_bp = Blueprint('main', __name__)
+
+PRODUCTS_PER_PAGE = 24
+DASHBOARD_PER_PAGE = 10
+SEARCH_PER_PAGE = 24
+
+@main_bp.route('/')
+@read_only
+def home():
+    def render():
+        active_products = Product.query.options(joinedload(Product.category)).filter(
+            Product.end_time > datetime.utcnow(),
+            Product.is_active == True
+        ).order_by(Product.created_at.desc()).limit(8).all()
+        return listing_fragment('partials/home_listings.html', active_products, [HOME_TAG],
+                                categories=category_cache.get(),
+                                category_counts=Product.count_by_category())
+
+    # The empty-state call to action differs for signed-in visitors
+    listings = page_cache.cached(('home', current_user.is_authenticated), render)
+    return render_template('home.html', listings=listings)
+
+@main_bp.route('/dashboard')
+@login_required
+@read_only
+def dashboard():
+    user_products = keyset_paginate(
+        Product.query.options(joinedload(Product.category)).filter_by(seller_id=current_user.id),
+        Product, request.args.get('products_cursor'), DASHBOARD_PER_PAGE)
+    user_bids = keyset_paginate(
+        Bid.query.options(joinedload(Bid.product)).filter_by(user_id=current_user.id),
+        Bid, request.args.get('bids_cursor'), DASHBOARD_PER_PAGE)
+
+    # Totals for the stats cards, independent of the page being shown
+    product_count, active_count = db.session.query(
+        func.count(Product.id),
+        func.count(case((and_(Product.is_active == True, Product.end_time > datetime.utcnow()), 1)))
+    ).filter(Product.seller_id == current_user.id).one()
+    bid_count = Bid.query.filter_by(user_id=current_user.id).count()
+
+    return render_template('dashboard.html', products=user_products, bids=user_bids,
+                           product_count=product_count, active_count=active_count,
+                           total_bids=bid_count)
+
+@main_bp.route('/users/<int:user_id>/bids')
+@login_required
+@read_only
+def user_bid_history(user_id):
+    # Your own bids, or anyone's for admins
+    if user_id != current_user.id and not current_user.is_admin:
+        abort(403)
+    per_page = min(max(request.args.get('per_page', PER_PAGE, type=int), 1), MAX_PER_PAGE)
+    page = user_bids(user_id, request.args.get('cursor'), per_page)
+    return jsonify(page_to_dict(page, product=True))
+
+@main_bp.route('/events/listing')
+def listing_events():
+    if not event_hub.live_updates:
+        abort(404)
+    # Optional ?ids=1,2,3 limits the stream to the products shown on the page
+    product_ids = {int(value) for value in request.args.get('ids', '').split(',') if value.isdigit()}
+    accept = (lambda data: data['product_id'] in product_ids) if product_ids else None
+    return Response(sse_stream([LISTING_CHANNEL], accept=accept),
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@main_bp.route('/metrics')
+def metrics_export():
+    # Prometheus scrape target; this worker's numbers only
+    if not metrics.enabled:
+        abort(404)
+    if not metrics.authorized(current_user):
+        abort(403)
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@main_bp.route('/category/<int:category_id>')
+@read_only
+def products_by_category(category_id):
+    category = next((c for c in category_cache.get() if c.id == category_id), None)
+    if category is None:
+        abort(404)
+    cursor = request.args.get('cursor')
+
+    def render():
+        products = keyset_paginate(Product.query.filter_by(category_id=category_id), Product,
+                                   cursor, PRODUCTS_PER_PAGE)
+        product_count = Product.query.filter_by(category_id=category_id).count()
+        return listing_fragment('partials/category_body.html', products, [category_tag(category_id)],
+                                category=category, product_count=product_count)
+
+    body = page_cache.cached(('category', category_id, cursor), render)
+    return render_template('category_products.html', category=category, body=body)
+
+@main_bp.route('/search')
+@read_only
+def search():
+    query = request.args.get('q', '').strip()
+    category_id = request.args.get('category', type=int)
+    price = request.args.get('price') if request.args.get('price') in PRICE_BUCKETS else None
+    ending_soon = request.args.get('ending') == 'soon'
+    results = search_products(query, category_id=category_id, price=price, ending_soon=ending_soon,
+                              page=request.args.get('page', 1, type=int), per_page=SEARCH_PER_PAGE)
+    return render_template('search.html', results=results, categories=category_cache.get(),
+                           category_id=category_id, price=price, ending_soon=ending_soon)
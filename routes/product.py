@@ -1,45 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-import os
-from werkzeug.utils import secure_filename
-from PIL import Image
 from models import db
-from models.product import Product, Bid
-from models.category import Category
-from config.config import Config
+from models.engine import read_only
+from models.product import Product, MaxBid
+from services.bid_history import MAX_PER_PAGE, PER_PAGE, page_to_dict, product_bids
+from services.bid_queue import bid_queue
+from services.bidding import place_max_bid, NOT_FOUND
+from services.category_cache import category_cache
+from services.events import event_hub, publish_bid, product_channel, sse_stream, SSE_HEADERS
+from services.images import image_pipeline
+from services.imports import FORMATS as IMPORT_FORMATS, detect_format, import_listings
+from services.page_cache import page_cache, category_tag, product_tag, HOME_TAG
+from services.rate_limit import rate_limiter
 
 product_bp = Blueprint('product', __name__)
 
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_image(file):
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # Add timestamp to make filename unique
-        name, ext = os.path.splitext(filename)
-        filename = f"{name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}{ext}"
-        
-        filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-        
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Resize image to max 800x600
-        try:
-            img = Image.open(file)
-            img.thumbnail((800, 600))
-            img.save(filepath)
-            return f"uploads/{filename}"
-        except Exception as e:
-            print(f"Error saving image: {e}")
-            return None
-    return None
-
 @product_bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add_product():
@@ -54,7 +30,7 @@ def add_product():
         if 'image' in request.files:
             image_file = request.files['image']
             if image_file.filename != '':
-                image_url = save_image(image_file)
+                image_url = image_pipeline.submit(image_file)
         
         product = Product(
             name=name,
@@ -69,59 +45,115 @@ def add_product():
         
         db.session.add(product)
         db.session.commit()
+        page_cache.invalidate(HOME_TAG, category_tag(category_id))
         
         flash('Product listed for auction successfully!', 'success')
-        return redirect(url_for('home'))
+        return redirect(url_for('main.home'))
     
-    categories = Category.query.all()
     min_date = (datetime.now() + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M')
     max_date = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%dT%H:%M')
     
     return render_template('add_product.html', 
-                         categories=categories,
+                         categories=category_cache.get(),
                          min_date=min_date,
                          max_date=max_date)
 
-@product_bp.route('/product/<int:product_id>')
+@product_bp.route('/import', methods=['POST'])
+@login_required
+def import_products():
+    # Either a multipart upload in "file" or the raw CSV/JSONL request body
+    upload = request.files.get('file')
+    if upload is not None and upload.filename:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, detect_format(content_type=request.mimetype)
+    fmt = request.args.get('format') or fmt
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Send a .csv or .jsonl file or pass ?format=csv|jsonl'}), 400
+
+    report = import_listings(stream, fmt, current_user.id)
+    return jsonify({'success': True, **report.to_dict()})
+
+@product_bp.route('/<int:product_id>')
+@read_only
 def view_product(product_id):
     product = Product.query.get_or_404(product_id)
-    return render_template('view_prod.html', product=product)
+    max_bid = None
+    if current_user.is_authenticated and current_user.id != product.seller_id:
+        max_bid = MaxBid.query.filter_by(product_id=product_id, user_id=current_user.id).first()
+    return render_template('view_prod.html', product=product, bids=product_bids(product_id),
+                           max_bid=max_bid)
+
+@product_bp.route('/<int:product_id>/bids')
+@read_only
+def bid_history(product_id):
+    # ?cursor= comes from the previous page's next_cursor
+    if db.session.get(Product, product_id) is None:
+        abort(404)
+    per_page = min(max(request.args.get('per_page', PER_PAGE, type=int), 1), MAX_PER_PAGE)
+    page = product_bids(product_id, request.args.get('cursor'), per_page)
+    return jsonify(page_to_dict(page, bidder=True))
 
 @product_bp.route('/bid/<int:product_id>', methods=['POST'])
+@rate_limiter.limit('bid')
 @login_required
 def place_bid(product_id):
-    product = Product.query.get_or_404(product_id)
-    
-    if not product.is_auction_active:
-        return jsonify({'success': False, 'error': 'Auction has ended'})
-    
-    if current_user.id == product.seller_id:
-        return jsonify({'success': False, 'error': 'You cannot bid on your own product'})
-    
     try:
         bid_amount = float(request.form.get('bid_amount'))
     except (TypeError, ValueError):
-        return jsonify({'success': False, 'error': 'Invalid bid amount'})
+        bid_amount = None
     
-    if bid_amount <= product.current_price:
-        return jsonify({'success': False, 'error': f'Bid must be higher than current price (${product.current_price})'})
+    outcome = bid_queue.place(product_id, current_user.id, bid_amount)
+    if outcome.status == NOT_FOUND:
+        abort(404)
+    if not outcome.accepted:
+        return jsonify({'success': False, 'error': outcome.error})
     
-    # Create new bid
-    bid = Bid(amount=bid_amount, user_id=current_user.id, product_id=product.id)
-    product.current_price = bid_amount
+    publish_bid(product_id, outcome.price, outcome.bid_count)
+    page_cache.invalidate(product_tag(product_id))
+    leading = outcome.leader_id == current_user.id
+    return jsonify({
+        'success': True, 
+        'message': 'Bid placed successfully!' if leading else "Bid placed, but another bidder's maximum outbid it",
+        'new_price': outcome.price,
+        'bid_count': outcome.bid_count,
+        'leading': leading
+    })
+
+@product_bp.route('/max-bid/<int:product_id>', methods=['POST'])
+@rate_limiter.limit('max_bid')
+@login_required
+def place_max(product_id):
+    # Proxy bidding: the engine bids for the user up to max_amount
+    try:
+        max_amount = float(request.form.get('max_amount'))
+    except (TypeError, ValueError):
+        max_amount = None
     
-    db.session.add(bid)
-    db.session.commit()
+    outcome = place_max_bid(product_id, current_user.id, max_amount)
+    if outcome.status == NOT_FOUND:
+        abort(404)
+    if not outcome.accepted:
+        return jsonify({'success': False, 'error': outcome.error})
     
+    publish_bid(product_id, outcome.price, outcome.bid_count)
+    page_cache.invalidate(product_tag(product_id))
+    leading = outcome.leader_id == current_user.id
     return jsonify({
-        'success': True, 
-        'message': 'Bid placed successfully!',
-        'new_price': product.current_price,
-        'bid_count': product.bids.count()
+        'success': True,
+        'message': f'Maximum set, you are leading at ${outcome.price:.2f}' if leading
+                   else "Maximum set, but another bidder's maximum is higher",
+        'new_price': outcome.price,
+        'bid_count': outcome.bid_count,
+        'leading': leading,
+        'max_amount': max_amount
     })
 
-@product_bp.route('/category/<int:category_id>')
-def products_by_category(category_id):
-    category = Category.query.get_or_404(category_id)
-    products = Product.query.filter_by(category_id=category_id).order_by(Product.created_at.desc()).all()
-    return render_template('category_products.html', category=category, products=products)
\ No newline at end of file
+@product_bp.route('/<int:product_id>/events')
+def product_events(product_id):
+    if not event_hub.live_updates:
+        abort(404)
+    product = Product.query.get_or_404(product_id)
+    initial = {'product_id': product.id, 'price': product.current_price, 'bid_count': product.bid_count}
+    return Response(sse_stream([product_channel(product_id)], initial),
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
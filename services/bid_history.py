@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from models import db
+from models.product import Product, Bid
+from models.user import User
+from utils.pagination import keyset_paginate
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+EXPORT_COLUMNS = ('id', 'product_id', 'product_name', 'user_id', 'username', 'amount', 'created_at')
+EXPORT_BATCH = 1000  # rows per fetch from the cursor and per chunk written out
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+
+def product_bids(product_id, cursor=None, per_page=PER_PAGE):
+    """One page of a product's bids, newest first, with the bidders loaded."""
+    query = Bid.query.options(joinedload(Bid.bidder)).filter_by(product_id=product_id)
+    return keyset_paginate(query, Bid, cursor, per_page)
+
+
+def user_bids(user_id, cursor=None, per_page=PER_PAGE):
+    """One page of a user's bids, newest first, with the products loaded."""
+    query = Bid.query.options(joinedload(Bid.product)).filter_by(user_id=user_id)
+    return keyset_paginate(query, Bid, cursor, per_page)
+
+
+def bid_to_dict(bid, bidder=False, product=False):
+    data = {'id': bid.id, 'product_id': bid.product_id, 'user_id': bid.user_id, 'amount': bid.amount,
+            'created_at': bid.created_at.isoformat() if bid.created_at else None}
+    if bidder:
+        data['username'] = bid.bidder.username
+    if product:
+        data['product_name'] = bid.product.name
+    return data
+
+
+def page_to_dict(page, **fields):
+    return {'bids': [bid_to_dict(bid, **fields) for bid in page], 'next_cursor': page.next_cursor}
+
+
+def export_bids(fmt, batch_size=EXPORT_BATCH):
+    """Yield every bid as CSV or JSON Lines text, ``batch_size`` rows per chunk.
+
+    Rows are plain tuples read through a streaming cursor (``yield_per``),
+    never ORM objects or a list, so memory stays flat however many bids
+    there are. The read runs in one transaction, a consistent snapshot
+    under WAL, ordered by bid id.
+    """
+    statement = select(Bid.id, Bid.product_id, Product.name, Bid.user_id, User.username, Bid.amount,
+                       Bid.created_at) \
+        .join(Product, Product.id == Bid.product_id).join(User, User.id == Bid.user_id) \
+        .order_by(Bid.id).execution_options(yield_per=batch_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writerow(EXPORT_COLUMNS)
+
+    for rows in db.session.execute(statement).partitions():
+        for row in rows:
+            values = list(row)
+            values[-1] = values[-1].isoformat() if values[-1] else None
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values))) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,198 @@
+import math
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+from models import db
+from models.product import Product, Bid, MaxBid
+from services.bidding import (ACCEPTED, BUSY, MAX_RETRIES, RETRY_BACKOFF, BidOutcome, check_bid,
+                              place_bid_atomic, settle_maxima)
+
+WRITE_MODES = ('direct', 'group')
+BUSY_MESSAGE = 'Bidding is busy right now, please try again'
+
+
+class _Conflict(Exception):
+    """A product changed under the batch; it is re-read and replayed."""
+
+
+class BidQueue:
+    """Optional group-commit write path for bids.
+
+    In ``direct`` mode ``place()`` is ``place_bid_atomic``: one transaction
+    and one commit per bid. In ``group`` mode the request thread queues the
+    bid and waits on a future while a single writer thread per process
+    drains the queue: everything that arrived while the previous batch was
+    committing (up to ``max_batch``) is validated in arrival order against
+    a running price kept in memory for the batch, standing proxy maxima
+    answer accepted bids as usual, and the whole batch is written in one
+    transaction with one commit. Products and maxima are re-read at the
+    start of each batch inside that transaction, so writes by other workers
+    are never missed; a conflict replays the batch. A request waits at most
+    ``timeout`` seconds for the writer to pick its bid up; a bid still
+    queued by then is withdrawn and answered BUSY. A writer thread that
+    died is replaced on the next bid.
+    """
+
+    def __init__(self, app=None, max_batch=64, max_wait=0.0, timeout=5.0):
+        self.app = app
+        self.mode = 'direct'
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.batches = self.batched_bids = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get('BID_WRITE_MODE', 'direct')
+        if self.mode not in WRITE_MODES:
+            raise ValueError(f'Unsupported BID_WRITE_MODE {self.mode!r}')
+        self.max_batch = app.config.get('BID_GROUP_MAX_BATCH', self.max_batch)
+        self.max_wait = app.config.get('BID_GROUP_MAX_WAIT_MS', self.max_wait * 1000) / 1000
+        self.timeout = app.config.get('BID_GROUP_TIMEOUT', self.timeout)
+        self._pid = None
+
+    def _get_queue(self):
+        # One writer thread per process, started on first use so forked workers get their own;
+        # a writer that died is replaced and takes over whatever was left in the queue
+        thread = self._thread
+        if self._pid != os.getpid() or thread is None or not thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._thread = None
+                    self._pid = os.getpid()
+                if self._thread is None or not self._thread.is_alive():
+                    if self._thread is not None:
+                        self.app.logger.error('Bid writer thread died, starting a new one')
+                    self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                    name='bid-writer', daemon=True)
+                    self._thread.start()
+        return self._queue
+
+    def place(self, product_id, user_id, amount):
+        """Place a bid; returns a BidOutcome exactly like ``place_bid_atomic``."""
+        if self.mode != 'group' or amount is None or not math.isfinite(amount):
+            return place_bid_atomic(product_id, user_id, amount)
+        future = Future()
+        self._get_queue().put((product_id, user_id, amount, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if future.cancel():
+                # Still queued: the writer will skip it, so the bid is never written
+                return BidOutcome(BUSY, error=BUSY_MESSAGE)
+        # Already in a batch: answering BUSY now could hide a bid that commits a moment later.
+        # The batch's retries are bounded and the writer answers every bid it took, even if it dies
+        return future.result()
+
+    def _run(self, requests):
+        with self.app.app_context():
+            while True:
+                batch = [requests.get()]
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch:
+                    try:
+                        wait = deadline - time.monotonic()
+                        batch.append(requests.get(timeout=wait) if wait > 0 else requests.get_nowait())
+                    except queue.Empty:
+                        break
+                # Drop bids whose request gave up waiting; the rest can no longer be withdrawn
+                batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                try:
+                    outcomes = self._commit(batch)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Bid batch failed')
+                    outcomes = [BidOutcome(BUSY, error=BUSY_MESSAGE)] * len(batch)
+                except BaseException:
+                    for _, _, _, future in batch:
+                        future.set_result(BidOutcome(BUSY, error=BUSY_MESSAGE))
+                    raise
+                finally:
+                    db.session.remove()
+                self.batches += 1
+                self.batched_bids += len(batch)
+                for (_, _, _, future), outcome in zip(batch, outcomes):
+                    future.set_result(outcome)
+
+    def _commit(self, batch):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                outcomes = self._apply(batch, datetime.utcnow())
+                db.session.commit()
+                return outcomes
+            except (OperationalError, _Conflict):
+                db.session.rollback()
+                if attempt == MAX_RETRIES:
+                    break
+                time.sleep(RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+        return [BidOutcome(BUSY, error=BUSY_MESSAGE)] * len(batch)
+
+    def _apply(self, batch, now):
+        product_ids = {product_id for product_id, _, _, _ in batch}
+        products = {row.id: row for row in db.session.execute(
+            select(Product.id, Product.current_price, Product.bid_count, Product.highest_bidder_id,
+                   Product.seller_id, Product.is_active, Product.end_time)
+            .where(Product.id.in_(product_ids)))}
+        maxima = defaultdict(list)
+        for row in db.session.execute(
+                select(MaxBid.product_id, MaxBid.user_id, MaxBid.amount)
+                .where(MaxBid.product_id.in_(product_ids))
+                .order_by(MaxBid.product_id, MaxBid.amount.desc(), MaxBid.placed_at, MaxBid.id)):
+            maxima[row.product_id].append((row.user_id, row.amount))
+
+        # product id -> [price, bid_count, leader] as the batch goes
+        state = {row.id: [row.current_price, row.bid_count, row.highest_bidder_id] for row in products.values()}
+        bids, outcomes = [], []
+        for product_id, user_id, amount, _ in batch:
+            product = products.get(product_id)
+            price = state[product_id][0] if product is not None else None
+            rejection = check_bid(product, user_id, amount, price, now)
+            if rejection is not None:
+                outcomes.append(rejection)
+                continue
+            placed = [(user_id, amount)]
+            placed += settle_maxima(amount, user_id, [m for m in maxima[product_id] if m[1] >= amount][:2])
+            bids.extend(Bid(amount=value, user_id=bidder, product_id=product_id, created_at=now)
+                        for bidder, value in placed)
+            leader, price = placed[-1]
+            bid_count = state[product_id][1] + len(placed)
+            state[product_id] = [price, bid_count, leader]
+            outcomes.append(BidOutcome(ACCEPTED, price=price, bid_count=bid_count, leader_id=leader))
+
+        db.session.add_all(bids)
+        for product_id, (price, bid_count, leader) in state.items():
+            before = products[product_id]
+            if bid_count == before.bid_count:
+                continue
+            result = db.session.execute(
+                update(Product)
+                .where(Product.id == product_id, Product.current_price == before.current_price,
+                       Product.bid_count == before.bid_count)
+                .values(current_price=price, bid_count=bid_count, highest_bidder_id=leader, last_bid_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                raise _Conflict(product_id)
+            if maxima[product_id]:
+                db.session.execute(delete(MaxBid).where(MaxBid.product_id == product_id, MaxBid.amount <= price)
+                                   .execution_options(synchronize_session=False))
+        return outcomes
+
+
+bid_queue = BidQueue()
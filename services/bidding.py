@@ -0,0 +1,259 @@
+import math
+import random
+import time
+from datetime import datetime
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from models import db
+from models.product import Product, Bid, MaxBid
+
+# Outcome statuses
+ACCEPTED = 'accepted'
+NOT_FOUND = 'not_found'
+ENDED = 'ended'
+OWN_PRODUCT = 'own_product'
+INVALID_AMOUNT = 'invalid_amount'
+TOO_LOW = 'too_low'
+BUSY = 'busy'
+MAX_NOT_RAISED = 'max_not_raised'
+
+# Proxy bids outbid the runner-up by this much, as the bid form suggests
+BID_INCREMENT = 1.0
+
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.01  # seconds, doubled on every attempt
+
+
+class BidOutcome:
+    """Result of a bid attempt, with the message shown to the bidder."""
+
+    def __init__(self, status, price=None, error=None, bid_count=None, leader_id=None):
+        self.status = status
+        self.price = price
+        self.error = error
+        self.bid_count = bid_count
+        self.leader_id = leader_id
+
+    @property
+    def accepted(self):
+        return self.status == ACCEPTED
+
+    def __repr__(self):
+        return f'<BidOutcome {self.status} {self.price}>'
+
+
+def place_bid_atomic(product_id, user_id, amount, max_retries=MAX_RETRIES):
+    """Place a bid using a single compare-and-set UPDATE.
+
+    The price check and the price write happen in one conditional UPDATE, so
+    two concurrent bidders can never both win against the same price. When
+    the UPDATE matches no row the product is re-read only to explain why.
+    Lock conflicts ("database is locked") are retried with backoff.
+    """
+    if amount is None or not math.isfinite(amount):
+        return _rejection(product_id, user_id, None)
+
+    for attempt in range(max_retries + 1):
+        try:
+            now = datetime.utcnow()
+            result = db.session.execute(
+                update(Product)
+                .where(Product.id == product_id,
+                       Product.is_active == True,
+                       Product.end_time > now,
+                       Product.seller_id != user_id,
+                       Product.current_price < amount)
+                .values(current_price=amount,
+                        bid_count=Product.bid_count + 1,
+                        highest_bidder_id=user_id,
+                        last_bid_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                db.session.rollback()
+                return _rejection(product_id, user_id, amount)
+
+            db.session.add(Bid(amount=amount, user_id=user_id, product_id=product_id, created_at=now))
+            # Still inside the write transaction, so this is the count our bid produced
+            bid_count = db.session.scalar(select(Product.bid_count).where(Product.id == product_id))
+            # A standing maximum above this bid answers it in the same transaction
+            price, bid_count, leader_id = _resolve_proxies(product_id, amount, user_id, bid_count, now)
+            db.session.commit()
+            return BidOutcome(ACCEPTED, price=price, bid_count=bid_count, leader_id=leader_id)
+        except OperationalError:
+            db.session.rollback()
+            if attempt == max_retries:
+                break
+            time.sleep(RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    return BidOutcome(BUSY, error='Bidding is busy right now, please try again')
+
+
+def place_max_bid(product_id, user_id, max_amount, max_retries=MAX_RETRIES):
+    """Store or raise ``user_id``'s maximum and let the engine bid up to it.
+
+    All standing maxima on the product are resolved in this one transaction,
+    and only the bids that become visible are written: at most the
+    runner-up's maximum and the leader's answer to it, instead of one
+    request, row and commit per step of a bidding war. A maximum can only
+    be raised, and must be above the current price.
+    """
+    if max_amount is None or not math.isfinite(max_amount):
+        return _rejection(product_id, user_id, None)
+
+    for attempt in range(max_retries + 1):
+        try:
+            now = datetime.utcnow()
+            product = db.session.execute(
+                select(Product.current_price, Product.highest_bidder_id, Product.bid_count)
+                .where(Product.id == product_id, Product.is_active == True, Product.end_time > now,
+                       Product.seller_id != user_id)
+            ).one_or_none()
+            if product is None or product.current_price >= max_amount:
+                db.session.rollback()
+                return _rejection(product_id, user_id, max_amount)
+
+            standing = db.session.execute(
+                select(MaxBid).where(MaxBid.product_id == product_id, MaxBid.user_id == user_id)
+            ).scalar_one_or_none()
+            if standing is not None and standing.amount >= max_amount:
+                db.session.rollback()
+                return BidOutcome(MAX_NOT_RAISED, product.current_price,
+                                  f'Your maximum is already ${standing.amount}')
+            if standing is None:
+                db.session.add(MaxBid(product_id=product_id, user_id=user_id, amount=max_amount,
+                                      placed_at=now))
+            else:
+                standing.amount, standing.placed_at = max_amount, now
+            db.session.flush()
+
+            price, bid_count, leader_id = _resolve_proxies(product_id, product.current_price,
+                                                           product.highest_bidder_id, product.bid_count, now)
+            if price is None:
+                # Someone else wrote the product since we read it
+                db.session.rollback()
+                continue
+            db.session.commit()
+            return BidOutcome(ACCEPTED, price=price, bid_count=bid_count, leader_id=leader_id)
+        except IntegrityError:
+            # A concurrent request from the same user inserted the maximum first;
+            # the retry reads it and raises it instead
+            db.session.rollback()
+        except OperationalError:
+            db.session.rollback()
+            if attempt == max_retries:
+                break
+            time.sleep(RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    return BidOutcome(BUSY, error='Bidding is busy right now, please try again')
+
+
+def settle_maxima(price, leader_id, top):
+    """The visible bids the standing maxima place against ``price`` held by ``leader_id``.
+
+    ``top`` holds the two strongest maxima at or above the price as
+    ``(user_id, amount)`` pairs, strongest first and earliest first on a
+    tie. The strongest one leads at the runner-up's ceiling plus
+    ``BID_INCREMENT``, capped at its own maximum; the runner-up is the
+    second maximum, or the current leader at the current price. A maximum
+    equal to the price was committed before the bid that set it, so it takes
+    the lead at that amount. Returns the ``(user_id, amount)`` bids to
+    record in order, the leader's last, or an empty list when nothing
+    changes.
+    """
+    if not top or (len(top) == 1 and top[0][0] == leader_id):
+        return []
+    winner = top[0]
+    runner_up = top[1] if len(top) > 1 else None
+    ceiling = runner_up[1] if runner_up is not None else price
+    new_price = min(winner[1], ceiling + BID_INCREMENT)
+    bids = []
+    if runner_up is not None and runner_up[1] < new_price:
+        bids.append((runner_up[0], runner_up[1]))
+    bids.append((winner[0], new_price))
+    return bids
+
+
+def _resolve_proxies(product_id, price, leader_id, bid_count, now):
+    """Settle the standing maxima on ``product_id`` and write the resulting bids.
+
+    Reads the two strongest maxima at or above the price from the
+    (product_id, amount) index; see ``settle_maxima``. Returns ``(price,
+    bid_count, leader_id)`` after settling, with ``price`` None when the
+    product changed since it was read.
+    """
+    top = db.session.execute(
+        select(MaxBid.user_id, MaxBid.amount)
+        .where(MaxBid.product_id == product_id, MaxBid.amount >= price)
+        .order_by(MaxBid.amount.desc(), MaxBid.placed_at, MaxBid.id).limit(2)
+    ).all()
+    bids = settle_maxima(price, leader_id, top)
+    if not bids:
+        return price, bid_count, leader_id
+
+    leader_id, new_price = bids[-1]
+    result = db.session.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.current_price == price, Product.bid_count == bid_count)
+        .values(current_price=new_price, bid_count=bid_count + len(bids),
+                highest_bidder_id=leader_id, last_bid_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None, bid_count, leader_id
+    db.session.add_all([Bid(amount=amount, user_id=user_id, product_id=product_id, created_at=now)
+                        for user_id, amount in bids])
+    # Maxima the price has reached can no longer bid
+    db.session.execute(delete(MaxBid).where(MaxBid.product_id == product_id, MaxBid.amount <= new_price)
+                       .execution_options(synchronize_session=False))
+    return new_price, bid_count + len(bids), leader_id
+
+
+def check_bid(product, user_id, amount, price=None, now=None):
+    """Why a bid of ``amount`` on ``product`` would be rejected, as a BidOutcome; None if it would not.
+
+    ``product`` is a Product or a row with the same columns (or None).
+    ``price`` replaces the stored current price, for callers that track it
+    themselves.
+    """
+    if product is None:
+        return BidOutcome(NOT_FOUND)
+    price = product.current_price if price is None else price
+    if not (product.is_active and product.end_time > (now or datetime.utcnow())):
+        return BidOutcome(ENDED, price, 'Auction has ended')
+    if user_id == product.seller_id:
+        return BidOutcome(OWN_PRODUCT, price, 'You cannot bid on your own product')
+    if amount is None:
+        return BidOutcome(INVALID_AMOUNT, price, 'Invalid bid amount')
+    if amount <= price:
+        return BidOutcome(TOO_LOW, price, f'Bid must be higher than current price (${price})')
+    return None
+
+
+def _rejection(product_id, user_id, amount):
+    # Same checks, in the same order, as the original read-then-write path
+    product = db.session.get(Product, product_id, populate_existing=True)
+    return check_bid(product, user_id, amount) or \
+        BidOutcome(TOO_LOW, product.current_price,
+                   f'Bid must be higher than current price (${product.current_price})')
+
+
+def refresh_bid_stats(product_ids=None):
+    """Recompute bid_count, highest_bidder_id and last_bid_at from the bids table.
+
+    Used to backfill existing rows and to repair drift. Runs as one
+    correlated UPDATE, optionally limited to ``product_ids``. Returns the
+    number of products touched.
+    """
+    product_bids = select(Bid).where(Bid.product_id == Product.id)
+    stmt = update(Product).values(
+        bid_count=product_bids.with_only_columns(func.count(Bid.id)).scalar_subquery(),
+        highest_bidder_id=product_bids.with_only_columns(Bid.user_id)
+            .order_by(Bid.amount.desc(), Bid.id.desc()).limit(1).scalar_subquery(),
+        last_bid_at=product_bids.with_only_columns(func.max(Bid.created_at)).scalar_subquery(),
+    ).execution_options(synchronize_session=False)
+    if product_ids is not None:
+        stmt = stmt.where(Product.id.in_(product_ids))
+    result = db.session.execute(stmt)
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import namedtuple
+from models.category import Category
+
+CachedCategory = namedtuple('CachedCategory', ['id', 'name', 'description'])
+
+
+class CategoryCache:
+    """Process-local copy of the category list.
+
+    Categories change rarely but are rendered on every page, so each worker
+    keeps them in memory. Writers call ``invalidate()``, which also replaces a
+    small stamp file; every worker compares the stamp (one ``stat`` call) on
+    read and reloads when it changed, so all gunicorn workers on the host
+    notice the change without a database round trip.
+    """
+
+    def __init__(self, app=None):
+        self.stamp_path = None
+        self._categories = None
+        self._version = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.stamp_path = app.config.get('CATEGORY_CACHE_STAMP') or \
+            os.path.join(app.instance_path, 'category_cache.version')
+        os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.stamp_path)
+        except (OSError, TypeError):
+            return None
+        # os.replace gives every stamp a new inode, so this changes on each write
+        return stat.st_ino, stat.st_mtime_ns
+
+    def get(self):
+        version = self._stamp()
+        categories = self._categories
+        if categories is not None and version == self._version:
+            return categories
+
+        with self._lock:
+            if self._categories is None or version != self._version:
+                self._categories = [CachedCategory(c.id, c.name, c.description)
+                                    for c in Category.query.all()]
+                self._version = version
+            return self._categories
+
+    def invalidate(self):
+        with self._lock:
+            self._categories = None
+            if self.stamp_path:
+                tmp_path = f'{self.stamp_path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w') as stamp:
+                    stamp.write(str(os.getpid()))
+                os.replace(tmp_path, self.stamp_path)
+            self._version = self._stamp()
+
+
+category_cache = CategoryCache()
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+LISTING_CHANNEL = 'listing'
+SUBSCRIBER_QUEUE_SIZE = 100
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def product_channel(product_id):
+    return f'product:{product_id}'
+
+
+class Subscription:
+    """A bounded mailbox for one stream. Slow readers lose the oldest events."""
+
+    def __init__(self, hub, channels):
+        self.hub = hub
+        self.channels = channels
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, channel, data):
+        while True:
+            try:
+                self._queue.put_nowait((channel, data))
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next (channel, data) pair, or None if nothing arrived within ``timeout``."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class LocalBackend:
+    """Deliver events to subscribers in this process only."""
+
+    def start(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, channel, data):
+        self.deliver(channel, data)
+
+
+class SQLiteBackend:
+    """Share events between worker processes on one host through a spool file.
+
+    A stand-in for a Redis-style broker: publishers append to a small SQLite
+    table and every subscribed process tails it from a single poller thread.
+    Rows older than ``retention`` seconds are pruned as the log is read.
+    Spool errors and events that cannot be delivered are logged and the
+    poller carries on.
+    """
+
+    def __init__(self, path, poll_interval=0.2, retention=60, logger=None):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.logger = logger or logging.getLogger(__name__)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS events ('
+                         'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+                         'payload TEXT NOT NULL, created REAL NOT NULL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def publish(self, channel, data):
+        conn = self._connection()
+        with conn:
+            conn.execute('INSERT INTO events (channel, payload, created) VALUES (?, ?, ?)',
+                         (channel, json.dumps(data), time.time()))
+
+    def start(self, deliver):
+        conn = self._connection()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+        thread = threading.Thread(target=self._poll, args=(deliver, last_id),
+                                  name='event-spool-poller', daemon=True)
+        thread.start()
+
+    def _poll(self, deliver, last_id):
+        conn = self._connect()
+        next_prune = 0.0
+        while True:
+            try:
+                rows = conn.execute('SELECT id, channel, payload FROM events WHERE id > ? ORDER BY id',
+                                    (last_id,)).fetchall()
+                for event_id, channel, payload in rows:
+                    last_id = event_id
+                    try:
+                        deliver(channel, json.loads(payload))
+                    except Exception:
+                        self.logger.exception('Could not deliver event %s on %s', event_id, channel)
+                if time.monotonic() >= next_prune:
+                    with conn:
+                        conn.execute('DELETE FROM events WHERE created < ?', (time.time() - self.retention,))
+                    next_prune = time.monotonic() + self.retention
+            except sqlite3.Error:
+                self.logger.exception('Reading the event spool %s failed', self.path)
+            time.sleep(self.poll_interval)
+
+
+class EventHub:
+    """In-process pub/sub for live auction updates with a pluggable backend.
+
+    Publishing goes through the backend; the backend hands every event back
+    to ``_deliver``, which fans it out to the local subscribers. With the
+    local backend that is a direct call, with a shared backend each process
+    receives the events published by all of them.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LocalBackend()
+        self._subscribers = defaultdict(set)
+        self._listeners = defaultdict(set)
+        self._lock = threading.Lock()
+        self._started_pid = None
+        self.live_updates = False
+        self.stream_seconds = 55
+        self.logger = logging.getLogger(__name__)
+
+    def init_app(self, app):
+        self.live_updates = app.config.get('LIVE_UPDATES', self.live_updates)
+        self.stream_seconds = app.config.get('SSE_MAX_SECONDS', self.stream_seconds)
+        self.logger = app.logger
+        if app.config.get('EVENT_BACKEND') == 'sqlite':
+            path = app.config.get('EVENT_SPOOL') or os.path.join(app.instance_path, 'events.db')
+            self.backend = SQLiteBackend(path, logger=app.logger)
+        self._started_pid = None
+
+    def _ensure_started(self):
+        # Started lazily, once per process, so workers forked from a preloaded
+        # app each get their own poller
+        if self._started_pid != os.getpid():
+            with self._lock:
+                if self._started_pid != os.getpid():
+                    self.backend.start(self._deliver)
+                    self._started_pid = os.getpid()
+
+    def publish(self, channel, data):
+        self._ensure_started()
+        self.backend.publish(channel, data)
+
+    def subscribe(self, *channels):
+        self._ensure_started()
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def listen(self, channel, callback):
+        """Call ``callback(data)`` on the delivering thread for every event on ``channel``."""
+        self._ensure_started()
+        with self._lock:
+            self._listeners[channel].add(callback)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def _deliver(self, channel, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+            listeners = list(self._listeners.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(channel, data)
+        for callback in listeners:
+            # One failing listener must not starve the others or stop the poller
+            try:
+                callback(data)
+            except Exception:
+                self.logger.exception('Event listener %r failed on %s', callback, channel)
+
+
+def publish_bid(product_id, price, bid_count):
+    """Announce an accepted bid to the product page and to listing pages."""
+    data = {'product_id': product_id, 'price': price, 'bid_count': bid_count}
+    event_hub.publish(product_channel(product_id), data)
+    event_hub.publish(LISTING_CHANNEL, data)
+
+
+def sse_stream(channels, initial=None, accept=None, keepalive=15, max_seconds=None):
+    """Yield Server-Sent Events from ``channels`` until ``max_seconds`` pass.
+
+    The subscription is opened on first iteration and closed when the client
+    disconnects. Streams end after SSE_MAX_SECONDS by default so an idle tab
+    never holds a worker thread for long; the browser's EventSource
+    reconnects on its own after ``retry``.
+    """
+    deadline = time.monotonic() + (event_hub.stream_seconds if max_seconds is None else max_seconds)
+    with event_hub.subscribe(*channels) as subscription:
+        yield 'retry: 3000\n\n'
+        if initial is not None:
+            yield f'event: bid\ndata: {json.dumps(initial)}\n\n'
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=keepalive)
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            _, data = message
+            if accept is None or accept(data):
+                yield f'event: bid\ndata: {json.dumps(data)}\n\n'
+
+
+event_hub = EventHub()
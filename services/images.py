@@ -0,0 +1,175 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# name -> bounding box; 'original' is the uploaded file itself
+RENDITIONS = {
+    'card': (400, 300),
+    'detail': (800, 600),
+}
+FORMATS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+HASHED_NAME = re.compile(r'^uploads/(?P<digest>[0-9a-f]{32})\.\w+$')
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def rendition_name(digest, rendition, image_format):
+    return f'{digest}_{rendition}.{FORMATS[image_format]}'
+
+
+def render_renditions(source_path, folder, digest, image_format, quality=85):
+    """Write every missing rendition of ``source_path``. Runs on a pool worker."""
+    # Pillow is imported on first use: only uploads need it, not worker startup
+    from PIL import Image
+
+    with Image.open(source_path) as original:
+        original.seek(0)
+        for rendition, size in RENDITIONS.items():
+            target = os.path.join(folder, rendition_name(digest, rendition, image_format))
+            if os.path.exists(target):
+                continue
+            img = original.copy()
+            img.thumbnail(size)
+            if image_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGBA')
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            # Write under a temporary name so readers never see a partial file
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            img.save(tmp_path, image_format, quality=quality)
+            os.replace(tmp_path, target)
+    return digest
+
+
+class ImagePipeline:
+    """Store uploads under content-hash names and render their sizes off the request.
+
+    ``submit`` only hashes, validates and writes the original bytes, then
+    queues the resizing and re-encoding on a pool, so the listing request
+    returns straight away. Identical uploads map to the same name and are
+    processed once. Until a rendition is ready, ``src`` falls back to the
+    original upload.
+    """
+
+    def __init__(self, app=None):
+        self.folder = None
+        self.image_format = 'JPEG'
+        self.executor_kind = 'thread'
+        self.workers = 2
+        self.logger = logging.getLogger(__name__)
+        self._executor = None
+        self._executor_pid = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.config['UPLOAD_FOLDER']
+        self.image_format = app.config.get('IMAGE_FORMAT', 'JPEG').upper()
+        self.executor_kind = app.config.get('IMAGE_EXECUTOR', 'thread')
+        self.workers = app.config.get('IMAGE_WORKERS', 2)
+        self.logger = app.logger
+        if self.image_format not in FORMATS:
+            raise ValueError(f'Unsupported IMAGE_FORMAT {self.image_format!r}')
+
+    def _get_executor(self):
+        # Created on first use, and again after a fork, so each gunicorn worker gets its
+        # own pool; the parent's pending renders never finish in a child. Caller holds _lock
+        if self._executor is None or self._executor_pid != os.getpid():
+            pool = ProcessPoolExecutor if self.executor_kind == 'process' else ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+            self._executor_pid = os.getpid()
+            self._pending = {}
+        return self._executor
+
+    def submit(self, file):
+        """Save an uploaded image and queue its renditions.
+
+        Returns the ``uploads/...`` path to store on the product, or None when
+        the file is not an allowed, readable image.
+        """
+        if not file or not allowed_file(file.filename):
+            return None
+
+        data = file.read()
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        ext = file.filename.rsplit('.', 1)[1].lower()
+        filename = f'{digest}.{ext}'
+        source_path = os.path.join(self.folder, filename)
+
+        if not os.path.exists(source_path):
+            from PIL import Image
+            try:
+                with Image.open(io.BytesIO(data)) as img:
+                    img.verify()
+            except Exception as exc:
+                self.logger.warning('Rejected upload %r: %s', file.filename, exc)
+                return None
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_path = f'{source_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as out:
+                out.write(data)
+            os.replace(tmp_path, source_path)
+
+        if not self._renditions_ready(digest):
+            self._queue(digest, source_path)
+        return f'uploads/{filename}'
+
+    def _renditions_ready(self, digest):
+        return all(os.path.exists(os.path.join(self.folder, rendition_name(digest, name, self.image_format)))
+                   for name in RENDITIONS)
+
+    def _queue(self, digest, source_path):
+        with self._lock:
+            if self.executor_kind == 'sync':
+                render_renditions(source_path, self.folder, digest, self.image_format)
+                return None
+            executor = self._get_executor()
+            if digest in self._pending:
+                return self._pending[digest]
+            future = executor.submit(render_renditions, source_path, self.folder,
+                                     digest, self.image_format)
+            self._pending[digest] = future
+        future.add_done_callback(lambda done: self._rendered(digest, done))
+        return future
+
+    def _rendered(self, digest, future):
+        with self._lock:
+            if self._pending.get(digest) is future:
+                del self._pending[digest]
+        if future.exception() is not None:
+            self.logger.error('Rendering %s failed', digest, exc_info=future.exception())
+
+    def wait(self, timeout=None):
+        """Block until every queued rendition is written (used by scripts)."""
+        with self._lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            future.result(timeout)
+
+    def src(self, image_url, rendition='detail'):
+        """Static path of ``rendition`` for a stored image_url, or the original."""
+        if not image_url or rendition == 'original':
+            return image_url
+        match = HASHED_NAME.match(image_url)
+        if match is None:
+            # Uploaded before renditions existed
+            return image_url
+        name = rendition_name(match.group('digest'), rendition, self.image_format)
+        if self.folder and os.path.exists(os.path.join(self.folder, name)):
+            return f'uploads/{name}'
+        return image_url
+
+
+image_pipeline = ImagePipeline()
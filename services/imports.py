@@ -0,0 +1,182 @@
+import csv
+import io
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from models import db
+from models.product import Product
+from services.category_cache import category_cache
+from services.page_cache import page_cache, HOME_TAG, category_tag
+from services.stats import materialized_enabled, refresh_category_stats
+
+FORMATS = ('csv', 'jsonl')
+CHUNK_SIZE = 500
+MAX_DURATION = timedelta(days=30)
+MAX_REPORTED_ERRORS = 1000
+MAX_NAME_LENGTH = Product.name.type.length
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {'rows': self.rows, 'inserted': self.inserted, 'failed': self.failed,
+                'errors': self.errors, 'errors_truncated': self.failed > len(self.errors)}
+
+
+def detect_format(filename=None, content_type=None):
+    """Pick csv or jsonl from a file name or content type; None if neither says."""
+    name = (filename or '').lower()
+    if name.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in (content_type or '') \
+            or 'jsonl' in (content_type or ''):
+        return 'jsonl'
+    return None
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line, record)`` pairs from a binary stream without loading it whole.
+
+    ``record`` is a dict, or an error message for lines that cannot be parsed.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, 'Too many fields'
+            else:
+                yield reader.line_num, record
+        return
+
+    for line, raw in enumerate(text, start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            yield line, f'Invalid JSON: {e}'
+            continue
+        yield line, record if isinstance(record, dict) else 'Expected a JSON object'
+
+
+def validate(record, categories, now):
+    """Turn one input record into Product column values or raise ValueError."""
+    name = str(record.get('name') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    if len(name) > MAX_NAME_LENGTH:
+        raise ValueError(f'name is longer than {MAX_NAME_LENGTH} characters')
+
+    try:
+        starting_price = float(record.get('starting_price'))
+    except (TypeError, ValueError):
+        raise ValueError('starting_price must be a number')
+    if not math.isfinite(starting_price) or starting_price <= 0:
+        raise ValueError('starting_price must be greater than 0')
+
+    category = str(record.get('category') or '').strip()
+    category_id = categories.get(category.lower())
+    if category_id is None:
+        raise ValueError(f'unknown category {category!r}' if category else 'category is required')
+
+    try:
+        end_time = datetime.fromisoformat(str(record.get('end_time') or '').strip())
+    except ValueError:
+        raise ValueError('end_time must be an ISO date and time, e.g. 2025-01-31T18:00')
+    if end_time.tzinfo is not None:
+        end_time = end_time.astimezone(timezone.utc).replace(tzinfo=None)
+    if not now < end_time <= now + MAX_DURATION:
+        raise ValueError('end_time must be in the future and at most 30 days away')
+
+    description = record.get('description')
+    return {
+        'name': name,
+        'description': str(description).strip() if description is not None else None,
+        'starting_price': starting_price,
+        'current_price': starting_price,
+        'end_time': end_time,
+        'category_id': category_id,
+    }
+
+
+def import_listings(stream, fmt, seller_id, chunk_size=CHUNK_SIZE):
+    """Stream CSV or JSONL listings into the products table for ``seller_id``.
+
+    Rows are validated and inserted ``chunk_size`` at a time with one
+    executemany per chunk, each chunk in its own transaction. A bad row is
+    reported by line number and skipped; the rest of the file still loads.
+    Category names are resolved once, case-insensitively, from the category
+    cache. Returns an ``ImportReport``.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported format {fmt!r}, expected one of {", ".join(FORMATS)}')
+
+    categories = {category.name.lower(): category.id for category in category_cache.get()}
+    report = ImportReport()
+    touched = set()
+    rows = read_rows(stream, fmt)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        report.rows += len(chunk)
+        now = datetime.utcnow()
+        valid = []
+        for line, record in chunk:
+            if isinstance(record, str):
+                report.error(line, record)
+                continue
+            try:
+                values = validate(record, categories, now)
+            except ValueError as e:
+                report.error(line, str(e))
+                continue
+            values.update(seller_id=seller_id, is_active=True, created_at=now)
+            valid.append((line, values))
+
+        report.inserted += _insert_chunk(valid, report)
+        touched.update(values['category_id'] for _, values in valid)
+
+    # Core inserts skip the ORM events that keep the materialized stats current
+    if report.inserted:
+        if materialized_enabled():
+            refresh_category_stats()
+        page_cache.invalidate(HOME_TAG, *(category_tag(category_id) for category_id in touched))
+    return report
+
+
+def _insert_chunk(valid, report):
+    if not valid:
+        return 0
+    try:
+        db.session.execute(insert(Product), [values for _, values in valid])
+        db.session.commit()
+        return len(valid)
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    # Something slipped past validation; retry row by row to find it
+    inserted = 0
+    for line, values in valid:
+        try:
+            db.session.execute(insert(Product), [values])
+            db.session.commit()
+            inserted += 1
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            report.error(line, f'database rejected the row: {getattr(e, "orig", None) or e}')
+    return inserted
@@ -0,0 +1,237 @@
+import bisect
+import hmac
+import threading
+import time
+from collections import defaultdict
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from models import db
+
+# Upper bounds in seconds; +Inf is implied
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TEMPLATE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Label for statements run outside a request: the bid writer, the auction closer, CLI commands
+BACKGROUND = '(background)'
+UNMATCHED = '(unmatched)'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metrics:
+    """Request, SQL and template timings of this worker process, in Prometheus text format.
+
+    Every request is timed into a histogram per endpoint and method and
+    counted per status; ``in_flight`` gauges what each endpoint is serving
+    right now. SQL statements are counted and timed from the engine's cursor
+    events and charged to the endpoint of the request that ran them, and
+    every ``render_template`` call is timed per template. ``render()`` adds
+    the counters the cache, limiter and bid services keep. Recording is a
+    few dict updates under one lock, cheap enough to leave on; with
+    METRICS_ENABLED off no hook is installed at all.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.token = None
+        self._lock = threading.Lock()
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self):
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.durations = {}  # (endpoint, method) -> _Histogram
+        self.in_flight = defaultdict(int)
+        self.sql_count = defaultdict(int)  # endpoint -> statements
+        self.sql_time = defaultdict(float)  # endpoint -> seconds
+        self.templates = {}  # template name -> _Histogram
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.token = app.config.get('METRICS_TOKEN') or None
+        if not self.enabled:
+            return
+        app.before_request(self._request_started)
+        app.teardown_request(self._request_finished)
+        app.after_request(self._record_status)
+        before_render_template.connect(self._render_started, app)
+        template_rendered.connect(self._render_finished, app)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._statement_started)
+            event.listen(engine, 'after_cursor_execute', self._statement_finished)
+
+    def authorized(self, user):
+        """Admins, or a scraper sending ``Authorization: Bearer <METRICS_TOKEN>``."""
+        if user.is_authenticated and user.is_admin:
+            return True
+        header = request.headers.get('Authorization', '')
+        return self.token is not None and hmac.compare_digest(header, f'Bearer {self.token}')
+
+    # Request hooks
+
+    def _request_started(self):
+        endpoint = request.endpoint or UNMATCHED
+        g.metrics_request = [endpoint, time.perf_counter(), 500]
+        with self._lock:
+            self.in_flight[endpoint] += 1
+
+    def _record_status(self, response):
+        current = g.get('metrics_request')
+        if current is not None:
+            current[2] = response.status_code
+        return response
+
+    def _request_finished(self, exc):
+        current = g.pop('metrics_request', None)
+        if current is None:
+            return
+        endpoint, started, status = current
+        elapsed = time.perf_counter() - started
+        key = (endpoint, request.method)
+        with self._lock:
+            self.in_flight[endpoint] -= 1
+            self.requests[key + (status,)] += 1
+            histogram = self.durations.get(key)
+            if histogram is None:
+                histogram = self.durations[key] = _Histogram(REQUEST_BUCKETS)
+            histogram.observe(elapsed)
+
+    # SQL hooks
+
+    def _statement_started(self, conn, cursor, statement, parameters, context, executemany):
+        context.metrics_started = time.perf_counter()
+
+    def _statement_finished(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        current = g.get('metrics_request') if has_request_context() else None
+        endpoint = current[0] if current is not None else BACKGROUND
+        with self._lock:
+            self.sql_count[endpoint] += 1
+            self.sql_time[endpoint] += elapsed
+
+    # Template hooks
+
+    def _render_started(self, sender, template, context, **extra):
+        g.setdefault('metrics_renders', []).append(time.perf_counter())
+
+    def _render_finished(self, sender, template, context, **extra):
+        renders = g.get('metrics_renders')
+        if not renders:
+            return
+        elapsed = time.perf_counter() - renders.pop()
+        name = template.name or '(string)'
+        with self._lock:
+            histogram = self.templates.get(name)
+            if histogram is None:
+                histogram = self.templates[name] = _Histogram(TEMPLATE_BUCKETS)
+            histogram.observe(elapsed)
+
+    # Exposition
+
+    def render(self):
+        with self._lock:
+            requests = sorted(self.requests.items())
+            durations = sorted((key, list(h.counts), h.sum) for key, h in self.durations.items())
+            in_flight = sorted(self.in_flight.items())
+            sql = sorted((endpoint, count, self.sql_time[endpoint]) for endpoint, count in self.sql_count.items())
+            templates = sorted((name, list(h.counts), h.sum) for name, h in self.templates.items())
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, buckets, counts, total, **labels):
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(**labels)} {total:.6f}')
+            lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+
+        family('auction_http_requests_total', 'counter', 'Requests served, by endpoint, method and status.')
+        for (endpoint, method, status), count in requests:
+            lines.append(f'auction_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} '
+                         f'{count}')
+        family('auction_http_request_duration_seconds', 'histogram', 'Request time, by endpoint and method.')
+        for (endpoint, method), counts, total in durations:
+            histogram('auction_http_request_duration_seconds', REQUEST_BUCKETS, counts, total,
+                      endpoint=endpoint, method=method)
+        family('auction_http_requests_in_flight', 'gauge', 'Requests being served, by endpoint.')
+        for endpoint, count in in_flight:
+            lines.append(f'auction_http_requests_in_flight{_labels(endpoint=endpoint)} {count}')
+        family('auction_sql_statements_total', 'counter', 'SQL statements executed, by endpoint.')
+        for endpoint, count, _ in sql:
+            lines.append(f'auction_sql_statements_total{_labels(endpoint=endpoint)} {count}')
+        family('auction_sql_duration_seconds_total', 'counter', 'Time spent executing SQL, by endpoint.')
+        for endpoint, _, seconds in sql:
+            lines.append(f'auction_sql_duration_seconds_total{_labels(endpoint=endpoint)} {seconds:.6f}')
+        family('auction_template_render_seconds', 'histogram', 'render_template time, by template.')
+        for name, counts, total in templates:
+            histogram('auction_template_render_seconds', TEMPLATE_BUCKETS, counts, total, template=name)
+
+        for name, kind, help_text, samples in _service_samples():
+            family(name, kind, help_text)
+            lines.extend(f'{name}{_labels(**labels) if labels else ""} {value}' for labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+
+def _service_samples():
+    # Counters the services already keep; imported here to keep this module's imports light
+    from services.bid_queue import bid_queue
+    from services.page_cache import page_cache
+    from services.passwords import password_hasher
+    from services.rate_limit import rate_limiter
+    from services.user_cache import user_cache
+
+    limits = rate_limiter.stats()
+    return [
+        ('auction_rate_limit_allowed_total', 'counter', 'Bid requests let through by the rate limiter.',
+         [({'scope': scope}, counts['allowed']) for scope, counts in limits.items()]),
+        ('auction_rate_limit_rejected_total', 'counter', 'Bid requests turned away with a 429.',
+         [({'scope': scope}, counts['rejected']) for scope, counts in limits.items()]),
+        ('auction_rate_limit_backend_errors_total', 'counter', 'Rate limiter backend failures (requests let through).',
+         [({}, rate_limiter.errors)]),
+        ('auction_page_cache_requests_total', 'counter', 'Page cache lookups.',
+         [({'result': 'hit'}, page_cache.hits), ({'result': 'miss'}, page_cache.misses)]),
+        ('auction_user_cache_requests_total', 'counter', 'Signed-in user lookups.',
+         [({'result': 'hit'}, user_cache.hits), ({'result': 'claim'}, user_cache.claim_hits),
+          ({'result': 'miss'}, user_cache.misses)]),
+        ('auction_password_hasher_busy_total', 'counter', 'Logins turned away because the hash pool was full.',
+         [({}, password_hasher.busy)]),
+        ('auction_bid_batches_total', 'counter', 'Group-commit bid batches written.',
+         [({}, bid_queue.batches)]),
+        ('auction_bid_batched_total', 'counter', 'Bids written through the group-commit queue.',
+         [({}, bid_queue.batched_bids)]),
+    ]
+
+
+metrics = Metrics()
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime
+from flask import render_template
+from markupsafe import Markup
+from services.events import event_hub
+
+INVALIDATION_CHANNEL = 'page-cache'
+HOME_TAG = 'home'
+
+# A rendered fragment, the tags it depends on and an optional lifetime cap in
+# seconds (e.g. until the first listed auction ends)
+Fragment = namedtuple('Fragment', ['html', 'tags', 'max_age'], defaults=[None])
+
+
+def product_tag(product_id):
+    return f'product:{product_id}'
+
+
+def category_tag(category_id):
+    return f'category:{category_id}'
+
+
+def listing_fragment(template, products, tags, **context):
+    """Render a listing fragment tagged with its products that expires when the first one ends."""
+    html = render_template(template, products=products, **context)
+    ends = [product.end_time for product in products if product.end_time]
+    max_age = (min(ends) - datetime.utcnow()).total_seconds() if ends else None
+    return Fragment(html, set(tags) | {product_tag(product.id) for product in products}, max_age)
+
+
+class PageCache:
+    """Rendered fragments of the public listing pages, with TTL and LRU eviction.
+
+    Entries are tagged with what they show (``home``, ``category:3``,
+    ``product:42``). Writers call ``invalidate()`` with the tags they
+    touched: matching entries are dropped here at once and, through the
+    event hub, in every other worker. Only user-independent fragments are
+    stored; the page around them, including the header, is rendered per
+    request.
+    """
+
+    def __init__(self, app=None, max_entries=512, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = defaultdict(set)
+        self._generation = 0
+        self._listening_pid = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PAGE_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.get('PAGE_CACHE_SIZE', self.max_entries)
+
+    def _listen(self):
+        if self._listening_pid != os.getpid():
+            event_hub.listen(INVALIDATION_CHANNEL, self._on_invalidate)
+            self._listening_pid = os.getpid()
+
+    def cached(self, key, render):
+        """Return the fragment stored under ``key``, calling ``render()`` on a miss.
+
+        ``render`` returns a ``Fragment``. A fragment whose tags were
+        invalidated while it was being rendered is returned but not stored.
+        """
+        if not self.ttl:
+            return Markup(render().html)
+        self._listen()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        fragment = render()
+        html = Markup(fragment.html)
+        ttl = self.ttl if fragment.max_age is None else max(0, min(self.ttl, fragment.max_age))
+        with self._lock:
+            if generation == self._generation and ttl > 0:
+                self._discard(key)
+                self._entries[key] = (now + ttl, html, frozenset(fragment.tags))
+                for tag in fragment.tags:
+                    self._tags[tag].add(key)
+                while len(self._entries) > self.max_entries:
+                    self._discard(next(iter(self._entries)))
+        return html
+
+    def invalidate(self, *tags):
+        """Drop every fragment carrying one of ``tags``, in all workers."""
+        self._drop(tags)
+        event_hub.publish(INVALIDATION_CHANNEL, {'tags': list(tags), 'pid': os.getpid()})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generation += 1
+
+    def _on_invalidate(self, data):
+        if data.get('pid') != os.getpid():
+            self._drop(data['tags'])
+
+    def _drop(self, tags):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+page_cache = PageCache()
@@ -0,0 +1,92 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+EXECUTORS = ('thread', 'sync')
+
+
+class HasherBusy(Exception):
+    """Raised when every hashing slot and queue place is taken."""
+
+
+def method_prefix(method):
+    """The ``method:params`` prefix Werkzeug writes for ``method``, with its defaults filled in."""
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        defaults = ['32768', '8', '1']  # n=2**15, r=8, p=1
+    elif name == 'pbkdf2':
+        defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        return method
+    return ':'.join([name] + params + defaults[len(params):])
+
+
+class PasswordHasher:
+    """Hash and check passwords on a small pool instead of the request thread.
+
+    scrypt and PBKDF2 are CPU-bound on purpose. Running them on a pool of
+    ``workers`` threads caps how many cores one process spends on them, so
+    a burst of logins cannot starve every other request. At most ``queue``
+    further calls wait for a thread; past that ``HasherBusy`` is raised
+    straight away rather than piling up requests. ``needs_rehash`` tells
+    whether a stored hash was made with another method or cost, so it can
+    be replaced on the next successful login.
+    """
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.executor_kind = 'thread'
+        self.workers = 2
+        self.queue = 16
+        self._executor = None
+        self._executor_pid = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self._lock = threading.Lock()
+        self.busy = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.executor_kind = app.config.get('PASSWORD_HASH_EXECUTOR', 'thread')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue = app.config.get('PASSWORD_HASH_QUEUE', 16)
+        if self.executor_kind not in EXECUTORS:
+            raise ValueError(f'Unsupported PASSWORD_HASH_EXECUTOR {self.executor_kind!r}')
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+
+    def _get_executor(self):
+        # Created on first use so forked gunicorn workers each get their own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-hash')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if self.executor_kind == 'sync':
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.busy += 1
+            raise HasherBusy('Too many password checks in progress')
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != method_prefix(self.method)
+
+
+password_hasher = PasswordHasher()
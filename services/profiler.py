@@ -0,0 +1,170 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+from datetime import datetime
+from flask import g, request
+from flask_login import current_user
+
+TRIGGER_HEADER = 'X-Profile'
+TRIGGER_ENVIRON = 'HTTP_' + TRIGGER_HEADER.upper().replace('-', '_')
+TRIGGER_ARG = '_profile'
+RESULT_HEADER = 'X-Profile-Id'
+SUMMARY_ROWS = 40
+MAX_DEPTH = 200
+MIN_SAMPLE_US = 1  # collapsed-stack lines below a microsecond are dropped
+
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == '~':  # built-ins: ('~', 0, "<built-in method time.sleep>")
+        return name.strip('<>')
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapsed_stacks(stats):
+    """``pstats`` data as collapsed stacks, ``frame;frame;frame microseconds`` per line.
+
+    cProfile records caller/callee edges, not whole stacks, so each stack is
+    rebuilt by walking down from the root functions and splitting a
+    function's own time between its callers in proportion to the time each
+    call edge accounts for (as flameprof and gprof2dot do). The result opens
+    in speedscope or flamegraph.pl; recursion is cut at the first repeat.
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+    lines = {}
+
+    def walk(func, stack, share):
+        if share * 1e6 < MIN_SAMPLE_US:
+            return
+        _, _, own, total, _ = stats[func]
+        fraction = share / total if total else 0.0
+        stack = stack + (_frame_name(func),)
+        own_us = int(own * fraction * 1e6)
+        if own_us >= MIN_SAMPLE_US:
+            key = ';'.join(stack)
+            lines[key] = lines.get(key, 0) + own_us
+        if len(stack) >= MAX_DEPTH:
+            return
+        for callee, edge_total in callees.get(func, ()):
+            if _frame_name(callee) in stack:
+                continue
+            walk(callee, stack, edge_total * fraction)
+
+    for root in roots:
+        walk(root, (), stats[root][3])
+    return ''.join(f'{stack} {us}\n' for stack, us in sorted(lines.items()))
+
+
+class RequestProfiler:
+    """cProfile for single requests, on demand, for admins.
+
+    A request from a signed-in admin carrying an ``X-Profile: 1`` header or
+    a ``?_profile=1`` query argument runs under cProfile from the profiler's
+    before_request hook to its after_request hook. Three files named after
+    the time and endpoint are written to PROFILE_DIR: ``.prof`` (pstats,
+    for snakeviz or ``python -m pstats``), ``.collapsed`` (collapsed stacks
+    for speedscope or flamegraph.pl) and ``.txt`` (the top functions by
+    cumulative time). The response names them in ``X-Profile-Id``. Any other
+    request pays only for the header and argument lookup; with
+    PROFILER_ENABLED off no hook is installed. The newest PROFILE_KEEP runs
+    are kept.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.folder = None
+        self.keep = 50
+        self.logger = None
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILER_ENABLED', True)
+        self.folder = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.keep = app.config.get('PROFILE_KEEP', self.keep)
+        self.logger = app.logger
+        if not self.enabled:
+            return
+        app.before_request(self._start)
+        app.after_request(self._stop)
+
+    def _triggered(self):
+        # Raw environ lookups first: this runs on every request
+        environ = request.environ
+        flag = environ.get(TRIGGER_ENVIRON)
+        if not flag and TRIGGER_ARG in environ.get('QUERY_STRING', ''):
+            flag = request.args.get(TRIGGER_ARG)
+        return flag not in (None, '', '0') and current_user.is_authenticated and current_user.is_admin
+
+    def _start(self):
+        if not self._triggered():
+            return
+        profile = cProfile.Profile()
+        g.request_profile = profile
+        profile.enable()
+
+    def _stop(self, response):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        try:
+            run_id = self.save(profile, request.endpoint or 'unmatched')
+        except OSError:
+            self.logger.exception('Could not save request profile')
+            return response
+        response.headers[RESULT_HEADER] = run_id
+        return response
+
+    def save(self, profile, endpoint):
+        """Write the three files for ``profile``; returns their common name."""
+        run_id = '{:%Y%m%dT%H%M%S}-{}-{}-{}'.format(datetime.utcnow(), re.sub(r'[^\w.-]', '_', endpoint),
+                                                     os.getpid(), next(self._counter))
+        base = os.path.join(self.folder, run_id)
+        os.makedirs(self.folder, exist_ok=True)
+        profile.dump_stats(base + '.prof')
+        stats = pstats.Stats(profile)
+        with open(base + '.collapsed', 'w') as out:
+            out.write(collapsed_stacks(stats.stats))
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats('cumulative').print_stats(SUMMARY_ROWS)
+        with open(base + '.txt', 'w') as out:
+            out.write(f"{request.method} {request.full_path.rstrip('?')}\n")
+            out.write(summary.getvalue())
+        self.logger.info('Profiled %s %s as %s', request.method, request.path, run_id)
+        self._prune()
+        return run_id
+
+    def runs(self):
+        """Saved runs, newest first, as ``{'id': ..., 'files': [...]}``."""
+        if not self.folder or not os.path.isdir(self.folder):
+            return []
+        runs = {}
+        for name in os.listdir(self.folder):
+            run_id, ext = os.path.splitext(name)
+            if ext in ('.prof', '.collapsed', '.txt'):
+                runs.setdefault(run_id, []).append(name)
+        return [{'id': run_id, 'files': sorted(runs[run_id])} for run_id in sorted(runs, reverse=True)]
+
+    def _prune(self):
+        with self._lock:
+            for run in self.runs()[self.keep:]:
+                for name in run['files']:
+                    try:
+                        os.remove(os.path.join(self.folder, name))
+                    except FileNotFoundError:
+                        pass
+
+
+request_profiler = RequestProfiler()
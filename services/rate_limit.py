@@ -0,0 +1,160 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from flask import jsonify, request, session
+
+BACKENDS = ('local', 'sqlite')
+PRUNE_INTERVAL = 60.0  # seconds between sweeps of idle local buckets
+
+
+class LocalBackend:
+    """Token buckets in this process's memory."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def take(self, key, rate, burst):
+        """Take a token from ``key``'s bucket; returns seconds to wait, 0 when one was taken."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            if now >= self._next_prune:
+                self._prune(now, rate, burst)
+        return wait
+
+    def _prune(self, now, rate, burst):
+        # A bucket idle long enough to refill is the same as no bucket
+        full_after = burst / rate
+        for key in [key for key, (_, updated) in self._buckets.items() if now - updated > full_after]:
+            del self._buckets[key]
+        self._next_prune = now + PRUNE_INTERVAL
+
+
+class SQLiteBackend:
+    """Token buckets shared by the worker processes on one host, in a small SQLite file.
+
+    Like the event spool, a stand-in for a Redis-style store: every take is
+    one short ``BEGIN IMMEDIATE`` transaction on a per-thread connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._next_prune = 0.0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                         'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def take(self, key, rate, burst):
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row is not None else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens - 1 if not wait else tokens, now))
+            if time.monotonic() >= self._next_prune:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - burst / rate,))
+                self._next_prune = time.monotonic() + PRUNE_INTERVAL
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class RateLimiter:
+    """Per-user token buckets for the bid endpoints.
+
+    ``limit(scope)`` wraps a view taking ``product_id``: each signed-in user
+    (or client address) gets ``burst`` requests per product at once, refilled
+    at ``rate`` per second; ``bursts`` overrides the burst for a scope. Over
+    the limit the view is not called at all, before the user is loaded or
+    the database touched, and the client gets a 429 with ``retry_after`` in
+    seconds. ``allowed`` and ``rejected`` count decisions per scope in this
+    process. If the shared backend fails, requests are let through.
+    """
+
+    def __init__(self, app=None):
+        self.rate = 2.0
+        self.burst = 5
+        self.bursts = {'max_bid': 2}
+        self.backend = LocalBackend()
+        self.allowed = defaultdict(int)
+        self.rejected = defaultdict(int)
+        self.errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rate = app.config.get('BID_RATE_PER_SECOND', self.rate)
+        self.burst = app.config.get('BID_RATE_BURST', self.burst)
+        self.bursts = {'max_bid': app.config.get('MAX_BID_RATE_BURST', self.bursts['max_bid'])}
+        kind = app.config.get('RATE_LIMIT_BACKEND', 'local')
+        if kind not in BACKENDS:
+            raise ValueError(f'Unsupported RATE_LIMIT_BACKEND {kind!r}')
+        if kind == 'sqlite':
+            path = app.config.get('RATE_LIMIT_SPOOL') or os.path.join(app.instance_path, 'rate_limits.db')
+            self.backend = SQLiteBackend(path)
+        else:
+            self.backend = LocalBackend()
+
+    def hit(self, scope, key):
+        """Count one request against ``key``; returns seconds to wait, 0 when it may proceed."""
+        if not self.rate:
+            return 0.0
+        try:
+            wait = self.backend.take(f'{scope}:{key}', self.rate, self.bursts.get(scope, self.burst))
+        except sqlite3.Error:
+            self.errors += 1
+            wait = 0.0
+        if wait:
+            self.rejected[scope] += 1
+        else:
+            self.allowed[scope] += 1
+        return wait
+
+    def limit(self, scope):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # The session's user id, so rejecting does not load the user
+                client = session.get('_user_id') or request.remote_addr
+                wait = self.hit(scope, f"{client}:{kwargs.get('product_id')}")
+                if wait:
+                    response = jsonify({'success': False, 'error': 'Too many bids, please slow down',
+                                        'retry_after': round(wait, 2)})
+                    return response, 429, {'Retry-After': str(math.ceil(wait))}
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {scope: {'allowed': self.allowed[scope], 'rejected': self.rejected[scope]}
+                for scope in sorted(set(self.allowed) | set(self.rejected))}
+
+
+rate_limiter = RateLimiter()
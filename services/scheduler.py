@@ -0,0 +1,157 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from models import db
+from models.product import Product, Bid, MaxBid
+from models.stats import CategoryStats
+from services.stats import materialized_enabled
+
+BATCH_SIZE = 500
+LOOKAHEAD = timedelta(minutes=10)
+REFRESH_INTERVAL = 30.0  # seconds between database rescans
+MAX_SLEEP = 1.0
+
+
+class AuctionCloser:
+    """Close auctions when their end_time passes and record the winning bid.
+
+    Upcoming end times are kept in a min-heap. Only auctions ending within
+    ``lookahead`` are held in memory; the database is rescanned every
+    ``refresh_interval`` seconds (and on start), so listings created by other
+    workers and auctions that expired while nothing was running are picked
+    up again. Closing is a single conditional UPDATE per batch, which makes
+    it safe to run more than one closer.
+    """
+
+    def __init__(self, app=None, batch_size=BATCH_SIZE, lookahead=LOOKAHEAD,
+                 refresh_interval=REFRESH_INTERVAL):
+        self.app = app
+        self.batch_size = batch_size
+        self.lookahead = lookahead
+        self.refresh_interval = refresh_interval
+        self._heap = []
+        self._scheduled = set()
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+
+    def __len__(self):
+        return len(self._heap)
+
+    def refresh(self, now=None):
+        """Load every open auction ending before the lookahead horizon."""
+        now = now or datetime.utcnow()
+        rows = db.session.execute(
+            select(Product.id, Product.end_time)
+            .where(Product.is_active == True,
+                   Product.end_time <= now + self.lookahead,
+                   Product.closed_at.is_(None))
+        ).all()
+        db.session.rollback()
+        with self._lock:
+            for product_id, end_time in rows:
+                if product_id not in self._scheduled:
+                    heapq.heappush(self._heap, (end_time, product_id))
+                    self._scheduled.add(product_id)
+        self._next_refresh = time.monotonic() + self.refresh_interval
+        return len(rows)
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                _, product_id = heapq.heappop(self._heap)
+                self._scheduled.discard(product_id)
+                due.append(product_id)
+        return due
+
+    def close_batch(self, product_ids, now=None):
+        """Close the given auctions if they are still open and past end_time.
+
+        Returns the number of auctions this call actually closed.
+        """
+        now = now or datetime.utcnow()
+        winning_bid = select(Bid.id).where(Bid.product_id == Product.id) \
+            .order_by(Bid.amount.desc(), Bid.id.desc()).limit(1).scalar_subquery()
+        closing = (Product.id.in_(product_ids),
+                   Product.is_active == True,
+                   Product.closed_at.is_(None),
+                   Product.end_time <= now)
+
+        result = db.session.execute(
+            update(Product).where(*closing)
+            .values(is_active=False, closed_at=now, winning_bid_id=winning_bid)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount and materialized_enabled():
+            # The counters normally follow ORM events, which a bulk UPDATE skips
+            for category_id, closed in db.session.execute(
+                    select(Product.category_id, func.count(Product.id))
+                    .where(Product.id.in_(product_ids), Product.closed_at == now)
+                    .group_by(Product.category_id)):
+                db.session.execute(update(CategoryStats)
+                                   .where(CategoryStats.category_id == category_id)
+                                   .values(active_count=CategoryStats.active_count - closed))
+        if result.rowcount:
+            # Proxy maxima on closed auctions can no longer bid
+            closed_ids = select(Product.id).where(Product.id.in_(product_ids), Product.closed_at == now)
+            db.session.execute(delete(MaxBid).where(MaxBid.product_id.in_(closed_ids))
+                               .execution_options(synchronize_session=False))
+        db.session.commit()
+        return result.rowcount
+
+    def run_pending(self, now=None):
+        """Close every auction that is due, in batches. Returns the number closed."""
+        if time.monotonic() >= self._next_refresh:
+            self.refresh(now)
+        now = now or datetime.utcnow()
+        closed = 0
+        while True:
+            due = self._pop_due(now)
+            if not due:
+                return closed
+            closed += self.close_batch(due, now)
+
+    def seconds_until_next(self):
+        with self._lock:
+            if not self._heap:
+                return MAX_SLEEP
+            wait = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+        return max(0.0, min(wait, MAX_SLEEP, self._next_refresh - time.monotonic()))
+
+    def run_forever(self):
+        app = self.app or current_app._get_current_object()
+        with app.app_context():
+            while not self._stop.is_set():
+                try:
+                    closed = self.run_pending()
+                    if closed:
+                        app.logger.info('Closed %d auctions', closed)
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Auction close pass failed')
+                self._stop.wait(self.seconds_until_next())
+            db.session.remove()
+
+    def start(self):
+        """Run the closer on a daemon thread inside this process."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name='auction-closer', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+auction_closer = AuctionCloser()
@@ -0,0 +1,170 @@
+import math
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, column, select, table, text
+from sqlalchemy.orm import joinedload
+from models import db
+from models.product import Product
+
+SEARCH_TABLE = 'products_fts'
+MAX_PAGE = 50
+# Matches a query looks at, newest first: ranking and facet counts cover at
+# most this many open listings, so their cost does not grow with the hit count
+MAX_CANDIDATES = 2000
+ENDING_SOON = timedelta(hours=24)
+
+# key -> (label, lower bound, upper bound)
+PRICE_BUCKETS = {
+    'under-500': ('Under ₹500', None, 500),
+    '500-2000': ('₹500 - ₹2,000', 500, 2000),
+    '2000-10000': ('₹2,000 - ₹10,000', 2000, 10000),
+    'over-10000': ('Over ₹10,000', 10000, None),
+}
+
+# External-content FTS5 index over products(name, description). The triggers
+# keep it in step with every insert, delete and name/description update,
+# including bulk inserts that bypass the ORM. Price-only updates from the
+# bid engine do not touch it.
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        name, description, content='products', content_rowid='id', tokenize='porter unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+fts = table(SEARCH_TABLE, column('rowid'), column('rank'))
+
+
+def create_search_index(conn):
+    """Create the search index and its triggers if missing. Returns True when it was created."""
+    if conn.dialect.name != 'sqlite':
+        return False
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                          {'name': SEARCH_TABLE}).first()
+    for statement in SEARCH_INDEX_DDL:
+        conn.execute(text(statement))
+    if not exists:
+        conn.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+    return not exists
+
+
+def rebuild_search_index():
+    db.session.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def match_expression(query):
+    """Turn free text into a safe FTS5 expression: every word, the last one prefix-matched.
+
+    Only the word still being typed is a prefix. A prefix phrase merges the
+    doclists of every term it covers, and bm25 scans them all for its IDF.
+    """
+    phrases = [f'"{word}"' for word in re.findall(r'\w+', query.lower())[:10]]
+    if phrases:
+        phrases[-1] += '*'
+    return ' AND '.join(phrases)
+
+
+class SearchResults:
+    def __init__(self, query, items, total, page, per_page, facets, capped=False):
+        self.query = query
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.facets = facets
+        self.capped = capped  # more matches than MAX_CANDIDATES; counts cover the newest
+
+    @property
+    def pages(self):
+        return min(MAX_PAGE, math.ceil(self.total / self.per_page))
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+
+def search_products(query, category_id=None, price=None, ending_soon=False, page=1, per_page=24):
+    """Ranked full-text search over open auctions with category, price and ending-soon facets.
+
+    One pass over the index walks the matches newest first and stops after
+    MAX_CANDIDATES open listings, reading each one's bm25 score, category,
+    price bucket and end time. Facets are counted and the page is ranked
+    from those rows, so a broad query costs the same as a narrow one. Each
+    facet is counted with the other active filters applied but not its
+    own, so the counts show what choosing that facet would return. When the
+    cap is reached, ``capped`` is set and the counts and ranking cover the
+    newest matches only.
+    """
+    expression = match_expression(query)
+    page = max(1, min(page, MAX_PAGE))
+    if not expression:
+        return SearchResults(query, [], 0, page, per_page, _empty_facets())
+
+    now = datetime.utcnow()
+    bucket = case(*[(_price_condition(low, high), key) for key, (_, low, high) in PRICE_BUCKETS.items()])
+    candidates = db.session.execute(
+        select(Product.id, fts.c.rank, Product.category_id, bucket, Product.end_time <= now + ENDING_SOON)
+        .select_from(fts.join(Product, Product.id == fts.c.rowid))
+        .where(text(f'{SEARCH_TABLE} MATCH :match').bindparams(match=expression),
+               Product.is_active == True, Product.end_time > now)
+        .order_by(fts.c.rowid.desc()).limit(MAX_CANDIDATES)
+    ).all()
+
+    category_counts, price_counts, ending_count = {}, dict.fromkeys(PRICE_BUCKETS, 0), 0
+    hits = []
+    for product_id, rank, row_category, row_price, row_ending in candidates:
+        in_category = category_id is None or row_category == category_id
+        in_price = price is None or row_price == price
+        in_ending = not ending_soon or row_ending
+        if in_price and in_ending:
+            category_counts[row_category] = category_counts.get(row_category, 0) + 1
+        if in_category and in_ending and row_price is not None:
+            price_counts[row_price] += 1
+        if in_category and in_price and row_ending:
+            ending_count += 1
+        if in_category and in_price and in_ending:
+            hits.append((rank, product_id))
+
+    # bm25 ranks are negative, best first
+    hits.sort()
+    ids = [product_id for _, product_id in hits[(page - 1) * per_page:page * per_page]]
+    items = []
+    if ids:
+        products = {p.id: p for p in Product.query.options(joinedload(Product.category))
+                    .filter(Product.id.in_(ids))}
+        items = [products[product_id] for product_id in ids if product_id in products]
+
+    facets = {
+        'categories': category_counts,
+        'price': [(key, label, price_counts[key]) for key, (label, _, _) in PRICE_BUCKETS.items()],
+        'ending_soon': ending_count,
+    }
+    return SearchResults(query, items, len(hits), page, per_page, facets,
+                         capped=len(candidates) == MAX_CANDIDATES)
+
+
+def _price_condition(low, high):
+    if low is None:
+        return Product.current_price < high
+    if high is None:
+        return Product.current_price >= low
+    return and_(Product.current_price >= low, Product.current_price < high)
+
+
+def _empty_facets():
+    return {
+        'categories': {},
+        'price': [(key, label, 0) for key, (label, _, _) in PRICE_BUCKETS.items()],
+        'ending_soon': 0,
+    }
@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+from models import db
+from services.metrics import BACKGROUND, UNMATCHED
+
+# Statements worth asking SQLite for a plan
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+MAX_PLANS = 512
+
+SlowQuery = namedtuple('SlowQuery', ['fingerprint', 'duration', 'params', 'endpoint', 'at'])
+Offender = namedtuple('Offender', ['fingerprint', 'count', 'total', 'max', 'endpoints', 'params', 'plan', 'last_at'])
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_PLACEHOLDERS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(statement):
+    """``statement`` with literals replaced by ``?`` and expanded IN/VALUES lists folded to ``(?, ...)``."""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _PLACEHOLDERS.sub('(?, ...)', statement)
+    return _SPACE.sub(' ', statement).strip()
+
+
+def param_shape(parameters, executemany=False):
+    """The types of the bound parameters, never their values: ``(int, str)`` or ``{name: str}``."""
+    if executemany:
+        rows = list(parameters or ())
+        return f'{len(rows)} x {param_shape(rows[0])}' if rows else '0 x ()'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {type(value).__name__}' for name, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters or ()) + ')'
+
+
+def explain(cursor, statement, parameters):
+    """EXPLAIN QUERY PLAN on the statement's own DB-API connection, as indented lines."""
+    rows = cursor.connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    depth, lines = {0: -1}, []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    """The statements that took at least SLOW_QUERY_MS, in a ring buffer.
+
+    Each entry keeps the normalized SQL, the types of its parameters and
+    the endpoint that ran it. The first time a normalized statement turns
+    up slow, SQLite's EXPLAIN QUERY PLAN for it is captured on the same
+    connection and a warning is logged; later occurrences reuse that plan.
+    ``offenders()`` groups the buffer by statement, by total time. Timing is
+    around ``cursor.execute``, which in SQLite covers sorting, grouping and
+    counting but not streaming the rows back. Below the threshold the cost
+    is two clock reads per statement; SLOW_QUERY_MS 0 installs nothing.
+    """
+
+    def __init__(self, app=None, threshold_ms=100, size=500):
+        self.threshold = threshold_ms / 1000
+        self.explain = True
+        self.logger = None
+        self._entries = deque(maxlen=size)
+        self._plans = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.threshold = app.config.get('SLOW_QUERY_MS', self.threshold * 1000) / 1000
+        self.explain = app.config.get('SLOW_QUERY_EXPLAIN', self.explain)
+        self._entries = deque(maxlen=app.config.get('SLOW_QUERY_LOG_SIZE', self._entries.maxlen))
+        self.logger = app.logger
+        if not self.threshold:
+            return
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._statement_started)
+            event.listen(engine, 'after_cursor_execute', self._statement_finished)
+
+    @property
+    def enabled(self):
+        return bool(self.threshold)
+
+    @property
+    def size(self):
+        return self._entries.maxlen
+
+    def _statement_started(self, conn, cursor, statement, parameters, context, executemany):
+        context.slow_query_started = time.perf_counter()
+
+    def _statement_finished(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'slow_query_started', None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.record(cursor, statement, parameters, executemany, duration)
+
+    def record(self, cursor, statement, parameters, executemany, duration):
+        fingerprint = normalize(statement)
+        endpoint = (request.endpoint or UNMATCHED) if has_request_context() else BACKGROUND
+        with self._lock:
+            known = fingerprint in self._plans
+            if not known:
+                if len(self._plans) >= MAX_PLANS:
+                    self._plans.clear()
+                self._plans[fingerprint] = None
+        if not known:
+            plan = None
+            if self.explain and not executemany and fingerprint.upper().startswith(EXPLAINABLE):
+                try:
+                    plan = explain(cursor, statement, parameters)
+                except Exception as exc:  # the plan is a diagnostic, never worth failing the request
+                    plan = [f'EXPLAIN failed: {exc}']
+            with self._lock:
+                self._plans[fingerprint] = plan
+            self.logger.warning('Slow query (%.1f ms, %s): %s', duration * 1000, endpoint, fingerprint)
+        entry = SlowQuery(fingerprint, duration, param_shape(parameters, executemany), endpoint, datetime.utcnow())
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def offenders(self, limit=50):
+        """Statements in the buffer grouped by normalized SQL, largest total time first."""
+        groups = {}
+        for entry in self.entries():
+            group = groups.setdefault(entry.fingerprint, {'count': 0, 'total': 0.0, 'max': 0.0, 'endpoints': {}})
+            group['count'] += 1
+            group['total'] += entry.duration
+            group['max'] = max(group['max'], entry.duration)
+            group['endpoints'][entry.endpoint] = group['endpoints'].get(entry.endpoint, 0) + 1
+            group['params'], group['last_at'] = entry.params, entry.at
+        ranked = sorted(groups.items(), key=lambda item: item[1]['total'], reverse=True)[:limit]
+        return [Offender(fingerprint, group['count'], group['total'], group['max'],
+                         sorted(group['endpoints'].items(), key=lambda item: -item[1]),
+                         group['params'], self._plans.get(fingerprint), group['last_at'])
+                for fingerprint, group in ranked]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._plans.clear()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,121 @@
+from flask import current_app, has_app_context
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+from models import db
+from models.user import User
+from models.category import Category
+from models.product import Product, Bid
+from models.stats import CategoryStats
+
+TOP_CATEGORIES = 5
+
+
+def materialized_enabled():
+    return has_app_context() and bool(current_app.config.get('MATERIALIZED_STATS'))
+
+
+def _live_stats():
+    """Per-category counts in one GROUP BY pass over products.
+
+    Bid totals come from the denormalized Product.bid_count, so the bids
+    table is never touched. A product counts as active while is_active is set.
+    """
+    product_count = func.count(Product.id)
+    return select(
+        Category.id, Category.name, Category.description,
+        product_count,
+        func.count(case((Product.is_active == True, 1))),
+        func.coalesce(func.sum(Product.bid_count), 0),
+    ).outerjoin(Product, Product.category_id == Category.id) \
+        .group_by(Category.id).order_by(product_count.desc(), Category.id)
+
+
+def _materialized_stats():
+    product_count = func.coalesce(CategoryStats.product_count, 0)
+    return select(
+        Category.id, Category.name, Category.description,
+        product_count,
+        func.coalesce(CategoryStats.active_count, 0),
+        func.coalesce(CategoryStats.bid_count, 0),
+    ).outerjoin(CategoryStats, CategoryStats.category_id == Category.id) \
+        .order_by(product_count.desc(), Category.id)
+
+
+def database_stats():
+    """Totals, per-category stats and top categories for the database info page."""
+    query = _materialized_stats() if materialized_enabled() else _live_stats()
+    category_stats = [
+        {
+            'id': category_id,
+            'name': name,
+            'description': description or 'No description',
+            'product_count': products,
+            'active_count': active,
+            'bid_count': bids,
+        }
+        for category_id, name, description, products, active, bids in db.session.execute(query)
+    ]
+    return {
+        'total_categories': len(category_stats),
+        'total_products': sum(c['product_count'] for c in category_stats),
+        'total_users': User.query.count(),
+        'total_bids': sum(c['bid_count'] for c in category_stats),
+        'category_stats': category_stats,
+        'top_categories': [c for c in category_stats if c['product_count'] > 0][:TOP_CATEGORIES],
+    }
+
+
+def refresh_category_stats():
+    """Rebuild the materialized stats table from the live aggregate."""
+    live = _live_stats().subquery()
+    db.session.execute(delete(CategoryStats))
+    db.session.execute(insert(CategoryStats).from_select(
+        ['category_id', 'product_count', 'active_count', 'bid_count'],
+        select(live.c[0], live.c[3], live.c[4], live.c[5])
+    ))
+    db.session.commit()
+    return CategoryStats.query.count()
+
+
+# Incremental maintenance. These run inside the flush of the write that
+# caused them, so the counters commit or roll back with it.
+
+def _bump(connection, category_filter, **deltas):
+    values = {name: getattr(CategoryStats, name) + delta for name, delta in deltas.items()}
+    connection.execute(update(CategoryStats).where(category_filter).values(**values))
+
+
+@event.listens_for(Category, 'after_insert')
+def _category_inserted(mapper, connection, category):
+    if materialized_enabled():
+        connection.execute(insert(CategoryStats).values(category_id=category.id))
+
+
+@event.listens_for(Category, 'after_delete')
+def _category_deleted(mapper, connection, category):
+    if materialized_enabled():
+        connection.execute(delete(CategoryStats).where(CategoryStats.category_id == category.id))
+
+
+@event.listens_for(Product, 'after_insert')
+def _product_inserted(mapper, connection, product):
+    if materialized_enabled():
+        _bump(connection, CategoryStats.category_id == product.category_id,
+              product_count=1, active_count=1 if product.is_active is not False else 0,
+              bid_count=product.bid_count or 0)
+
+
+@event.listens_for(Product, 'after_update')
+def _product_updated(mapper, connection, product):
+    if not materialized_enabled():
+        return
+    history = inspect(product).attrs.is_active.history
+    if history.has_changes():
+        _bump(connection, CategoryStats.category_id == product.category_id,
+              active_count=1 if product.is_active else -1)
+
+
+@event.listens_for(Bid, 'after_insert')
+def _bid_inserted(mapper, connection, bid):
+    if materialized_enabled():
+        category_id = select(Product.category_id).where(Product.id == bid.product_id).scalar_subquery()
+        _bump(connection, CategoryStats.category_id == category_id, bid_count=1)
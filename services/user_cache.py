@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from flask import has_request_context, session
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from models import db
+from models.user import User
+from services.events import event_hub
+
+INVALIDATION_CHANNEL = 'user-cache'
+CLAIMS_KEY = '_user_claims'
+STALE_KEY = 'user_cache_stale'
+
+# A change to any of these drops the cached identity
+WATCHED_COLUMNS = ('username', 'email', 'is_admin', 'password_hash')
+
+
+class CachedUser(UserMixin, namedtuple('CachedUser', ['id', 'username', 'email', 'is_admin', 'created_at'])):
+    """Read-only snapshot of a user, what ``current_user`` is on cached requests.
+
+    It carries what views and templates read off ``current_user``; code that
+    needs the ORM object (relationships, writes) loads it by ``id``.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, bool(user.is_admin), user.created_at)
+
+    def claims(self):
+        return {'id': self.id, 'username': self.username, 'email': self.email, 'is_admin': self.is_admin,
+                'created_at': self.created_at.isoformat() if self.created_at else None}
+
+    @classmethod
+    def from_claims(cls, claims):
+        created_at = claims.get('created_at')
+        return cls(claims['id'], claims['username'], claims['email'], claims['is_admin'],
+                   datetime.fromisoformat(created_at) if created_at else None)
+
+
+class UserCache:
+    """Authenticated users for flask_login, kept per worker with TTL and LRU eviction.
+
+    Saves the ``users`` lookup ``load_user`` otherwise makes on every
+    logged-in request. A commit that changes a user's name, email, admin
+    flag or password, or deletes the user, drops the entry here and, through
+    the event hub, in every other worker.
+
+    With ``claims`` on, the identity is also kept in the signed session
+    cookie, so a worker that has not seen the user yet skips the lookup too.
+    Claims are honoured for ``ttl`` seconds after they were issued and never
+    when they predate an invalidation of that user seen by this worker.
+    """
+
+    def __init__(self, app=None, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.claims = False
+        self._entries = OrderedDict()
+        self._revoked = {}  # user id -> time.time() of its last invalidation
+        self._generation = 0
+        self._listening_pid = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.claim_hits = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.get('USER_CACHE_SIZE', self.max_entries)
+        self.claims = app.config.get('USER_SESSION_CLAIMS', False)
+
+    def _listen(self):
+        if self._listening_pid != os.getpid():
+            event_hub.listen(INVALIDATION_CHANNEL, self._on_invalidate)
+            self._listening_pid = os.getpid()
+
+    def get(self, user_id):
+        """The ``CachedUser`` for ``user_id``, or None when there is no such user."""
+        if not self.ttl:
+            return self._load(user_id)
+        self._listen()
+        if self.claims and has_request_context():
+            user = self._from_session(user_id)
+            if user is not None:
+                self.claim_hits += 1
+                return user
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        user = self._load(user_id)
+        if user is not None:
+            self._store(user, now, generation)
+        return user
+
+    def remember(self, user):
+        """Cache ``user`` (an ORM ``User``) right after login, and write its claims."""
+        if not self.ttl:
+            return
+        with self._lock:
+            generation = self._generation
+        self._store(CachedUser.from_user(user), time.monotonic(), generation)
+
+    def forget(self):
+        """Remove the identity claims from the session, e.g. on logout."""
+        session.pop(CLAIMS_KEY, None)
+
+    def invalidate(self, *user_ids):
+        """Drop the cached identities of ``user_ids``, in all workers."""
+        at = time.time()
+        self._drop(user_ids, at)
+        event_hub.publish(INVALIDATION_CHANNEL, {'user_ids': list(user_ids), 'at': at, 'pid': os.getpid()})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def _load(self, user_id):
+        user = db.session.get(User, user_id)
+        return CachedUser.from_user(user) if user is not None else None
+
+    def _store(self, user, now, generation):
+        with self._lock:
+            # Not stored when the user was invalidated while it was loading
+            if generation != self._generation:
+                return
+            self._entries.pop(user.id, None)
+            self._entries[user.id] = (now + self.ttl, user)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.claims and has_request_context():
+            session[CLAIMS_KEY] = dict(user.claims(), issued=time.time())
+
+    def _from_session(self, user_id):
+        claims = session.get(CLAIMS_KEY)
+        if not claims or claims.get('id') != user_id:
+            return None
+        issued = claims.get('issued', 0)
+        if time.time() - issued > self.ttl or issued <= self._revoked.get(user_id, 0):
+            return None
+        return CachedUser.from_claims(claims)
+
+    def _on_invalidate(self, data):
+        if data.get('pid') != os.getpid():
+            self._drop(data['user_ids'], data['at'])
+
+    def _drop(self, user_ids, at):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                self._revoked[user_id] = max(at, self._revoked.get(user_id, 0))
+            # Claims older than the TTL are refused anyway
+            expired = [user_id for user_id, revoked in self._revoked.items() if revoked < at - self.ttl]
+            for user_id in expired:
+                del self._revoked[user_id]
+
+
+user_cache = UserCache()
+
+
+# Changed users are collected per session while it flushes and only
+# invalidated once the transaction commits, so a rollback costs nothing and
+# other workers never reload the old row
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, user):
+    state = inspect(user)
+    if any(state.attrs[name].history.has_changes() for name in WATCHED_COLUMNS):
+        state.session.info.setdefault(STALE_KEY, set()).add(user.id)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, user):
+    object_session(user).info.setdefault(STALE_KEY, set()).add(user.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    stale = session.info.pop(STALE_KEY, None)
+    if stale:
+        user_cache.invalidate(*stale)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop(STALE_KEY, None)
@@ -0,0 +1,32 @@
+// Live bid updates over Server-Sent Events.
+// A page opts in with data-live-stream="<stream url>" on a container; price,
+// bid count and minimum-bid elements carry the product id they belong to.
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.querySelector('[data-live-stream]');
+    if (!container || !window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource(container.dataset.liveStream);
+    source.addEventListener('bid', function(e) {
+        const data = JSON.parse(e.data);
+        const nextBid = (data.price + 1).toFixed(2);
+
+        document.querySelectorAll(`[data-live-price="${data.product_id}"]`).forEach(function(el) {
+            el.textContent = data.price.toFixed(2);
+        });
+        document.querySelectorAll(`[data-live-bids="${data.product_id}"]`).forEach(function(el) {
+            el.textContent = data.bid_count;
+        });
+        document.querySelectorAll(`[data-live-min-bid="${data.product_id}"]`).forEach(function(el) {
+            if (el.tagName === 'INPUT') {
+                el.min = nextBid;
+                if (parseFloat(el.value) < parseFloat(nextBid)) {
+                    el.value = nextBid;
+                }
+            } else {
+                el.textContent = nextBid;
+            }
+        });
+    });
+});
@@ -0,0 +1,80 @@
+import base64
+from datetime import datetime
+from flask import request, url_for
+from sqlalchemy import String, cast, literal, tuple_
+
+
+class KeysetPage:
+    """One page of a keyset-paginated listing ordered by (created_at, id) descending."""
+
+    def __init__(self, items, next_cursor, cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(created_at, row_id):
+    raw = f'{created_at}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (created_at, id) for a cursor token, or None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, row_id = raw.split('|')
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(query, model, cursor, per_page):
+    """Fetch the page of ``query`` that follows ``cursor``.
+
+    Rows are ordered newest first on (created_at, id) and the page starts
+    strictly after the cursor row, so every page is a single index range
+    scan no matter how deep it is. The cursor carries created_at exactly as
+    stored, because SQLite keeps timestamps as text and rows written by
+    CURRENT_TIMESTAMP and by SQLAlchemy use different formats.
+    """
+    stored_created_at = cast(model.created_at, String)
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, row_id = position
+        query = query.filter(tuple_(model.created_at, model.id) <
+                             tuple_(literal(created_at, String), literal(row_id)))
+    rows = query.add_columns(stored_created_at) \
+        .order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last, last_created_at = rows[-1]
+        next_cursor = encode_cursor(last_created_at, last.id)
+    items = [row[0] for row in rows]
+    return KeysetPage(items, next_cursor, cursor if position is not None else None)
+
+
+def page_url(**params):
+    """URL of the current view with some query-string parameters replaced or removed."""
+    args = request.args.to_dict()
+    args.update(params)
+    args = {key: value for key, value in args.items() if value is not None}
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
@@ -0,0 +1,30 @@
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Record every SQL statement an engine executes while the block is active.
+
+        with QueryCounter(db.engine) as counter:
+            client.get('/')
+        print(counter.count)
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False